@@ -0,0 +1,246 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Literal, Optional
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.models.analytics import AnalyticsState, DailySales, ProductDailySales, ProductSales
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.outbox import ORDER_PLACED, handler
+
+# Incrementally maintained sales rollups (see app.models.analytics) and the
+# report queries the admin analytics endpoints run on them
+
+TopProductsSort = Literal["revenue", "units"]
+_ROLLUP_COLUMNS = ("orders", "revenue_cents", "units")
+
+
+def add_to_rollup(session: Session, model, keys: dict, values: dict) -> None:
+    # Upsert that adds values to the existing counters (INSERT ... ON CONFLICT DO UPDATE)
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert_ = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert_(table).values(**keys, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: table.c[c] + stmt.excluded[c] for c in values},
+        )
+        session.execute(stmt)
+        return
+
+    # Portable fallback: conditional increment, insert when no row matched
+    conditions = [table.c[k] == v for k, v in keys.items()]
+    result = session.execute(
+        table.update().where(*conditions).values({c: table.c[c] + v for c, v in values.items()})
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table).values(**keys, **values))
+
+
+def add_rows_to_rollup(session: Session, model, keys: list[str], rows: list[dict]) -> None:
+    # Batched add_to_rollup: one executemany upsert adding each row's other columns to its counters
+    if not rows:
+        return
+    table = model.__table__
+    values = [c for c in rows[0] if c not in keys]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert_ = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert_(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: table.c[c] + stmt.excluded[c] for c in values},
+        )
+        session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        add_to_rollup(session, model, {k: row[k] for k in keys}, {c: row[c] for c in values})
+
+
+def order_day(created_at: str) -> date:
+    return datetime.fromisoformat(created_at).date()
+
+
+@handler(ORDER_PLACED)
+def record_order(payload: dict, session: Session) -> None:
+    """
+    Add one placed order to the rollups. Runs in the outbox worker's
+    transaction, which also deletes the event, so an order is counted
+    exactly once; orders already covered by a backfill are skipped.
+    """
+    state = session.get(AnalyticsState, 1)
+    if state is not None and state.backfilled_through is not None and payload["order_id"] <= state.backfilled_through:
+        return
+
+    day = order_day(payload["created_at"])
+    items = session.exec(
+        select(OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price_cents)
+        .where(OrderItem.order_id == payload["order_id"])
+    ).all()
+    units = sum(qty for _, qty, _ in items)
+
+    add_to_rollup(
+        session,
+        DailySales,
+        {"day": day, "currency": payload["currency"]},
+        {"orders": 1, "revenue_cents": payload["total_cents"], "units": units},
+    )
+    for product_id, qty, unit_price_cents in items:
+        values = {"orders": 1, "revenue_cents": qty * unit_price_cents, "units": qty}
+        add_to_rollup(
+            session, ProductDailySales, {"day": day, "product_id": product_id, "currency": payload["currency"]}, values
+        )
+        add_to_rollup(session, ProductSales, {"product_id": product_id}, values)
+
+
+def backfill(engine: Engine) -> dict:
+    """
+    Rebuild the rollups from the order history in one transaction, with one
+    grouped query per table. Events of orders included here that are still
+    in the outbox are skipped afterwards (AnalyticsState.backfilled_through).
+    """
+    with Session(engine) as session:
+        last_id = session.exec(select(func.max(Order.id))).one() or 0
+        day = func.date(Order.created_at)
+
+        daily_orders = session.exec(
+            select(day, Order.currency, func.count(), func.sum(Order.total_cents))
+            .where(Order.id <= last_id)
+            .group_by(day, Order.currency)
+        ).all()
+        daily_units = dict(
+            ((d, c), units)
+            for d, c, units in session.exec(
+                select(day, Order.currency, func.sum(OrderItem.quantity))
+                .join(OrderItem, OrderItem.order_id == Order.id)
+                .where(Order.id <= last_id)
+                .group_by(day, Order.currency)
+            ).all()
+        )
+        product_daily = session.exec(
+            select(
+                day,
+                OrderItem.product_id,
+                Order.currency,
+                func.count(func.distinct(Order.id)),
+                func.sum(OrderItem.quantity * OrderItem.unit_price_cents),
+                func.sum(OrderItem.quantity),
+            )
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .where(Order.id <= last_id)
+            .group_by(day, OrderItem.product_id, Order.currency)
+        ).all()
+
+        for model in (DailySales, ProductDailySales, ProductSales):
+            session.execute(delete(model))
+
+        daily_rows = [
+            {
+                "day": _as_date(d),
+                "currency": c,
+                "orders": orders,
+                "revenue_cents": revenue or 0,
+                "units": daily_units.get((d, c), 0) or 0,
+            }
+            for d, c, orders, revenue in daily_orders
+        ]
+        product_daily_rows = [
+            {
+                "day": _as_date(d),
+                "product_id": pid,
+                "currency": c,
+                "orders": orders,
+                "revenue_cents": revenue or 0,
+                "units": units or 0,
+            }
+            for d, pid, c, orders, revenue, units in product_daily
+        ]
+        totals: dict[int, dict] = defaultdict(lambda: dict.fromkeys(_ROLLUP_COLUMNS, 0))
+        for row in product_daily_rows:
+            for c in _ROLLUP_COLUMNS:
+                totals[row["product_id"]][c] += row[c]
+
+        if daily_rows:
+            session.execute(insert(DailySales.__table__), daily_rows)
+        if product_daily_rows:
+            session.execute(insert(ProductDailySales.__table__), product_daily_rows)
+        if totals:
+            session.execute(
+                insert(ProductSales.__table__), [{"product_id": pid, **t} for pid, t in totals.items()]
+            )
+
+        state = session.get(AnalyticsState, 1) or AnalyticsState(id=1)
+        state.backfilled_through = last_id
+        session.add(state)
+        session.commit()
+
+    return {
+        "orders_through_id": last_id,
+        "days": len({row["day"] for row in daily_rows}),
+        "products": len(totals),
+    }
+
+
+def _as_date(value) -> date:
+    # func.date() returns a string on SQLite and a date on PostgreSQL
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def revenue_by_day(session: Session, start: date, end: date, currency: Optional[str] = None) -> list[dict]:
+    query = (
+        select(DailySales)
+        .where(DailySales.day >= start, DailySales.day <= end)
+        .order_by(DailySales.day, DailySales.currency)
+    )
+    if currency:
+        query = query.where(DailySales.currency == currency.upper())
+    return [
+        {
+            "day": row.day.isoformat(),
+            "currency": row.currency,
+            "orders": row.orders,
+            "revenue_cents": row.revenue_cents,
+            "units": row.units,
+        }
+        for row in session.exec(query).all()
+    ]
+
+
+def top_products(
+    session: Session, start: date, end: date, limit: int, sort: TopProductsSort, currency: Optional[str] = None
+) -> list[dict]:
+    # Products with the most revenue (or units) between start and end, read from the daily rollup;
+    # one row per product and currency, since revenue in different currencies can't be added up
+    revenue = func.sum(ProductDailySales.revenue_cents).label("revenue_cents")
+    units = func.sum(ProductDailySales.units).label("units")
+    query = (
+        select(ProductDailySales.product_id, Product.title, ProductDailySales.currency, revenue, units)
+        .outerjoin(Product, Product.id == ProductDailySales.product_id)
+        .where(ProductDailySales.day >= start, ProductDailySales.day <= end)
+        .group_by(ProductDailySales.product_id, Product.title, ProductDailySales.currency)
+        .order_by(
+            (revenue if sort == "revenue" else units).desc(), ProductDailySales.product_id, ProductDailySales.currency
+        )
+        .limit(limit)
+    )
+    if currency:
+        query = query.where(ProductDailySales.currency == currency.upper())
+    return [
+        {"product_id": pid, "title": title, "currency": currency, "revenue_cents": rev, "units": u}
+        for pid, title, currency, rev, u in session.exec(query).all()
+    ]
+
+
+def product_sales_page(session: Session, limit: int, after_id: Optional[int] = None) -> list[ProductSales]:
+    # All-time totals per product, in product id order (keyset pagination, one extra row)
+    query = select(ProductSales).order_by(ProductSales.product_id).limit(limit + 1)
+    if after_id is not None:
+        query = query.where(ProductSales.product_id > after_id)
+    return list(session.exec(query).all())
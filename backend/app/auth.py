@@ -1,15 +1,20 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
 import os
+import time
 
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
+from app.db import get_async_session, get_session
 from app.models.user import User
+from app.hashing import hash_pool
+from app.cache import TTLCache
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_SUPER_SECRET")
@@ -17,6 +22,15 @@ ALGORITHM = "HS256"
 
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24h
 MAX_BCRYPT_BYTES = 72  # bcrypt input size limit
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # cost factor; stored hashes are upgraded on login
+
+# Authentication caches: decoded tokens (until their exp) and the users they resolve to
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))  # seconds
+
+token_cache = TTLCache(AUTH_TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+user_cache = TTLCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL)
 
 # OAuth2 scheme for extracting the Bearer token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -28,7 +42,7 @@ def hash_password(password: str) -> str:
     if len(pw_bytes) > MAX_BCRYPT_BYTES:
         raise ValueError(f"Password is too long (máx {MAX_BCRYPT_BYTES} bytes in UTF-8).")
 
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(pw_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -41,6 +55,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
+async def hash_password_async(password: str) -> str:
+    # hash_password on the password worker pool (raises PasswordHasherBusy when saturated)
+    return await hash_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    # verify_password on the password worker pool (raises PasswordHasherBusy when saturated)
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    # True when a stored hash uses a different cost than BCRYPT_ROUNDS ("$2b$12$...")
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
 def create_access_token(sub: str, expires_delta: Optional[timedelta] = None) -> str:
     # Create a JWT access token
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -48,28 +80,98 @@ def create_access_token(sub: str, expires_delta: Optional[timedelta] = None) ->
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session),
-) -> User:
-    # Retrieve the currently authenticated user from the JWT
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def decode_subject(token: str) -> str:
+    # Validate the JWT and return its subject (the user email); valid tokens
+    # are cached by hash until they expire, so the signature is checked once
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    sub = token_cache.get(key)
+    if sub is not None:
+        return sub
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        sub = payload.get("sub")
-        if not sub:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise credentials_exception()
+
+    sub = payload.get("sub")
+    if not sub:
+        raise credentials_exception()
+
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else token_cache.ttl
+    if ttl > 0:
+        token_cache.set(key, sub, ttl=ttl)
+    return sub
+
+
+def bearer_subject(headers) -> Optional[str]:
+    # Subject of the request's Bearer token, or None when it has no valid one
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_subject(token)
+    except HTTPException:
+        return None
 
-    user = session.exec(select(User).where(User.email == sub)).first()
-    if not user:
-        raise credentials_exception
+
+def cached_user(sub: str) -> Optional[User]:
+    # Detached copy of a recently loaded user, or None
+    data = user_cache.get(sub)
+    return User(**data) if data is not None else None
+
+
+def remember_user(user: User) -> None:
+    user_cache.set(user.email, user.model_dump())
+
+
+def invalidate_user(email: str) -> None:
+    # Call after deleting a user or changing their flags/credentials
+    user_cache.delete(email)
+
+
+def auth_cache_stats() -> dict:
+    return {"token": token_cache.stats(), "user": user_cache.stats()}
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_session),
+) -> User:
+    # Retrieve the currently authenticated user from the JWT
+    sub = decode_subject(token)
+
+    user = cached_user(sub)
+    if user is None:
+        user = session.exec(select(User).where(User.email == sub)).first()
+        if not user:
+            raise credentials_exception()
+        remember_user(user)
+
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    # Async twin of get_current_user (DB_ASYNC mode)
+    sub = decode_subject(token)
+
+    user = cached_user(sub)
+    if user is None:
+        user = (await session.exec(select(User).where(User.email == sub))).first()
+        if not user:
+            raise credentials_exception()
+        remember_user(user)
 
     return user
 
@@ -0,0 +1,257 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Iterable, Optional
+
+from fastapi import Request, Response
+
+# Product read cache configuration
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "2048"))     # cached product rows
+LISTING_CACHE_SIZE = int(os.getenv("LISTING_CACHE_SIZE", "256"))      # cached listing/search pages
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "60"))       # seconds
+
+_MISSING = object()
+
+
+class TTLCache:
+    # Bounded, thread-safe mapping with a per-entry TTL and LRU eviction
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self._evict_overflow()
+
+    def _evict_overflow(self) -> None:
+        # Drop least recently used entries beyond maxsize (lock held)
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        # Drop one entry (lock held); subclasses keep their indexes in step here
+        del self._data[key]
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ListingCache(TTLCache):
+    """
+    TTLCache for listing, search and related pages that also records which
+    products each page shows and which product columns decide what it shows
+    (filters, sort order; "id" for pages a new product can enter). A product
+    write then evicts only the pages it can change instead of all of them.
+    Every invalidation bumps `generation`: a page rendered from data read
+    before it is not stored (pass the generation taken before the read).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self.generation = 0
+        self._tags: dict[Hashable, tuple[frozenset, frozenset]] = {}
+        self._by_product: dict[int, set] = {}
+        self._by_column: dict[str, set] = {}
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        *,
+        product_ids: Iterable[int] = (),
+        columns: Iterable[str] = (),
+        generation: Optional[int] = None,
+    ) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return  # products changed while the page was being read
+            if key in self._data:
+                self._remove(key)
+            tags = (frozenset(product_ids), frozenset(columns))
+            self._data[key] = (expires_at, value)
+            self._tags[key] = tags
+            for product_id in tags[0]:
+                self._by_product.setdefault(product_id, set()).add(key)
+            for column in tags[1]:
+                self._by_column.setdefault(column, set()).add(key)
+            self._evict_overflow()
+
+    def _remove(self, key: Hashable) -> None:
+        super()._remove(key)
+        product_ids, columns = self._tags.pop(key)
+        for index, tags in ((self._by_product, product_ids), (self._by_column, columns)):
+            for tag in tags:
+                keys = index[tag]
+                keys.discard(key)
+                if not keys:
+                    del index[tag]
+
+    def invalidate(self, product_ids: Iterable[int], columns: Optional[Iterable[str]] = None) -> int:
+        # Evict pages showing any of the products and pages depending on a changed
+        # column (None = any column may have changed); returns how many were evicted
+        with self._lock:
+            self.generation += 1
+            keys: set = set()
+            for product_id in product_ids:
+                keys.update(self._by_product.get(product_id, ()))
+            for column in self._by_column if columns is None else columns:
+                keys.update(self._by_column.get(column, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def evict(self, keys: Iterable[Hashable]) -> int:
+        # Evict the given pages (a change their tags can't express); returns how many were evicted
+        with self._lock:
+            self.generation += 1
+            present = [key for key in keys if key in self._data]
+            for key in present:
+                self._remove(key)
+            return len(present)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self._tags.clear()
+            self._by_product.clear()
+            self._by_column.clear()
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    # Rendered JSON body plus its strong ETag and any extra response headers
+    body: bytes
+    etag: str
+    headers: dict = field(default_factory=dict)
+
+
+def make_etag(body: bytes) -> str:
+    # Strong validator derived from the exact response bytes
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def render_cached(body: bytes, headers: Optional[dict] = None) -> CachedResponse:
+    return CachedResponse(body=body, etag=make_etag(body), headers=headers or {})
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # Evaluate If-None-Match against the current ETag
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison: a compressed copy carries W/"..." for the same representation
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    # Return 304 when the client already has this representation, else the cached body
+    headers = {"ETag": entry.etag, **entry.headers}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# Single product responses keyed by id, listing/search pages keyed by query,
+# and product ids keyed by slug (the response itself lives in product_cache)
+product_cache = TTLCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+listing_cache = ListingCache(LISTING_CACHE_SIZE, PRODUCT_CACHE_TTL)
+slug_cache = TTLCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+
+# Called with the same product ids by invalidate_products (e.g. the catalog snapshot)
+_invalidation_listeners: list = []
+
+
+def add_invalidation_listener(listener) -> None:
+    if listener not in _invalidation_listeners:
+        _invalidation_listeners.append(listener)
+
+
+def invalidate_products(
+    product_ids: Optional[Iterable[int]] = None,
+    slugs: Optional[Iterable[str]] = None,
+    columns: Optional[Iterable[str]] = None,
+) -> None:
+    # Drop cached entries after product writes (None = every product changed);
+    # pass the old slugs of renamed or deleted products, and the columns that
+    # changed when known (e.g. ["stock"] for orders, [] for a delete, None = any)
+    if product_ids is not None:
+        product_ids = list(product_ids)
+    if product_ids is None:
+        product_cache.clear()
+        slug_cache.clear()
+        listing_cache.clear()
+    else:
+        for product_id in product_ids:
+            product_cache.delete(product_id)
+        for slug in slugs or ():
+            slug_cache.delete(slug)
+        # Pages showing these products, and pages they may enter or leave
+        listing_cache.invalidate(product_ids, columns)
+
+    for listener in _invalidation_listeners:
+        listener(product_ids)
+
+
+def cache_stats() -> dict:
+    return {
+        "product": product_cache.stats(),
+        "listing": listing_cache.stats(),
+        "slug": slug_cache.stats(),
+    }
@@ -0,0 +1,180 @@
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Iterable, Iterator, Literal, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.models.product import Product, ProductCreate
+
+# Bulk catalog import/export (admin endpoints and app.cli)
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))   # rows per transaction
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))   # rows per query
+MAX_REPORTED_ERRORS = 100                                          # per-row errors listed in the report
+
+CatalogFormat = Literal["csv", "ndjson"]
+
+# Column order of the CSV export (also accepted by the import; "id" is ignored there)
+EXPORT_COLUMNS = ["id", "slug", "title", "description", "price_cents", "currency", "stock"]
+_FIELDS = [c for c in EXPORT_COLUMNS if c != "id"]
+_table = Product.__table__
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    # Decode a stream of byte chunks into text lines (keeps the newline, drops a UTF-8 BOM)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+def iter_rows(lines: Iterable[str], format: CatalogFormat) -> Iterator[tuple[int, object]]:
+    # (row number, raw row) pairs; rows that cannot be parsed come back as an error message
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        for number, row in enumerate(reader, start=1):
+            # Empty CSV cells mean "no value" (description) or a missing required field
+            yield number, {k: (v if v != "" else None) for k, v in row.items() if k is not None}
+        return
+
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, "Invalid JSON"
+
+
+def validate_row(raw: object) -> tuple[Optional[dict], list[str]]:
+    # Validate one row against ProductCreate: (values, []) or (None, error messages)
+    if not isinstance(raw, dict):
+        return None, [raw if isinstance(raw, str) else "Row must be an object"]
+    try:
+        product = ProductCreate.model_validate(raw)
+    except ValidationError as e:
+        return None, [
+            f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+        ]
+    return product.model_dump(), []
+
+
+def upsert_batch(session: Session, rows: dict[str, dict]) -> tuple[int, int]:
+    # Insert or update a batch keyed by slug in one transaction: (inserted, updated)
+    existing = set(
+        session.exec(select(Product.slug).where(Product.slug.in_(list(rows)))).all()
+    )
+    columns = [k for k in _FIELDS if k != "slug"]
+
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # INSERT ... ON CONFLICT (slug) DO UPDATE as one executemany: a product
+        # created with one of these slugs since the SELECT above is updated
+        # instead of aborting the batch (the counts may then be off by that row)
+        insert_ = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert_(_table)
+        stmt = stmt.on_conflict_do_update(index_elements=["slug"], set_={k: stmt.excluded[k] for k in columns})
+        session.execute(stmt, list(rows.values()))
+        session.commit()
+        return len(rows) - len(existing), len(existing)
+
+    # Portable fallback: executemany UPDATE for known slugs, INSERT for the rest
+    updates = [
+        {**{f"b_{k}": v for k, v in values.items() if k != "slug"}, "b_slug": slug}
+        for slug, values in rows.items()
+        if slug in existing
+    ]
+    inserts = [values for slug, values in rows.items() if slug not in existing]
+    if updates:
+        stmt = (
+            update(_table)
+            .where(_table.c.slug == bindparam("b_slug"))
+            .values({k: bindparam(f"b_{k}") for k in columns})
+        )
+        session.execute(stmt, updates)
+    if inserts:
+        session.execute(insert(_table), inserts)
+    session.commit()
+    return len(inserts), len(updates)
+
+
+def import_products(session: Session, rows: Iterable[tuple[int, object]], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Validate and upsert (by slug) a stream of rows in batches of batch_size,
+    one transaction per batch, so memory stays bounded whatever the input
+    size. Invalid rows are skipped and reported; a slug repeated in the input
+    keeps its last row.
+    """
+    report = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+    batch: dict[str, dict] = {}
+
+    def flush():
+        inserted, updated = upsert_batch(session, batch)
+        report["inserted"] += inserted
+        report["updated"] += updated
+        batch.clear()
+
+    for number, raw in rows:
+        report["rows"] += 1
+        values, errors = validate_row(raw)
+        if errors:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"row": number, "errors": errors})
+            continue
+
+        batch[values["slug"]] = values
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return report
+
+
+def iter_product_batches(session: Session, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    # Whole catalog in id order, one keyset-paginated query per batch
+    columns = [getattr(Product, c) for c in EXPORT_COLUMNS]
+    last_id = 0
+    while True:
+        rows = session.exec(
+            select(*columns).where(Product.id > last_id).order_by(Product.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def export_products(session: Session, format: CatalogFormat) -> Iterator[str]:
+    # Stream the catalog as CSV (with header) or NDJSON, one chunk per batch
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in iter_product_batches(session):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+
+    for rows in iter_product_batches(session):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows
+        )
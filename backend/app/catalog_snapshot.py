@@ -0,0 +1,360 @@
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+from typing import Iterable, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.cache import add_invalidation_listener
+from app.db import env_flag
+from app.models.product import Product
+from app.pagination import decode_cursor
+
+# Optional in-memory read engine for the catalog listing: an immutable,
+# column-oriented copy of the product table. Filters run as vectorized NumPy
+# operations when NumPy is installed, or as plain loops over the arrays otherwise.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+CATALOG_SNAPSHOT = env_flag("CATALOG_SNAPSHOT")                              # off by default
+SNAPSHOT_REFRESH_DELAY = float(os.getenv("SNAPSHOT_REFRESH_DELAY_MS", "5")) / 1000  # coalesces bursts of writes
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = [c.name for c in Product.__table__.columns]
+# Listing rows: same fields and order as a select(*PRODUCT_COLUMNS) row, so
+# next_page_cursor and rows_to_json work on either
+ProductRow = namedtuple("ProductRow", _COLUMNS)
+
+
+class CatalogSnapshot:
+    """
+    Products sorted by id, one array per numeric column ("q" = int64,
+    currencies as "B" codes into a small table) and lists of interned
+    strings. Never mutated once built: writers build a new snapshot
+    (sharing unchanged columns) and swap the module reference.
+    """
+
+    def __init__(self, ids, prices, stocks, currency_codes, currencies, titles, descriptions, slugs, version):
+        self.ids: array = ids
+        self.prices: array = prices
+        self.stocks: array = stocks
+        self.currency_codes: array = currency_codes
+        self.currencies: tuple[str, ...] = currencies
+        self.titles: list[str] = titles
+        self.descriptions: list[Optional[str]] = descriptions
+        self.slugs: list[str] = slugs
+        self.version = version
+        self.built_at = time.time()
+        # Positions ordered by (price, id), for the price sorts
+        self.price_order = array("q", sorted(range(len(ids)), key=lambda i: (prices[i], ids[i])))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, version: int = 1) -> "CatalogSnapshot":
+        ids, prices, stocks, codes = array("q"), array("q"), array("q"), array("B")
+        titles, descriptions, slugs = [], [], []
+        currency_index: dict[str, int] = {}
+        for row in rows:
+            ids.append(row.id)
+            prices.append(row.price_cents)
+            stocks.append(row.stock)
+            codes.append(currency_index.setdefault(row.currency, len(currency_index)))
+            titles.append(sys.intern(row.title))
+            descriptions.append(row.description)
+            slugs.append(row.slug)
+        return cls(ids, prices, stocks, codes, tuple(currency_index), titles, descriptions, slugs, version)
+
+    def position(self, product_id: int) -> Optional[int]:
+        i = bisect.bisect_left(self.ids, product_id)
+        return i if i < len(self.ids) and self.ids[i] == product_id else None
+
+    def row(self, i: int) -> ProductRow:
+        values = {
+            "id": self.ids[i],
+            "title": self.titles[i],
+            "description": self.descriptions[i],
+            "price_cents": self.prices[i],
+            "currency": self.currencies[self.currency_codes[i]],
+            "stock": self.stocks[i],
+            "slug": self.slugs[i],
+        }
+        return ProductRow(**{c: values[c] for c in _COLUMNS})
+
+    def with_stock(self, changes: dict[int, int]) -> "CatalogSnapshot":
+        # New snapshot with only the stock column copied and patched
+        stocks = array("q", self.stocks)
+        for i, stock in changes.items():
+            stocks[i] = stock
+        patched = object.__new__(CatalogSnapshot)
+        patched.__dict__.update(self.__dict__)
+        patched.stocks = stocks
+        patched.version = self.version + 1
+        patched.built_at = time.time()
+        return patched
+
+    def _start(self, sort: str, cursor: Optional[str]) -> int:
+        # Index in the sort order of the first row after the cursor (same keyset rules as SQL)
+        if sort == "id":
+            if not cursor:
+                return 0
+            (last_id,) = decode_cursor(cursor, (int,))
+            return bisect.bisect_right(self.ids, last_id)
+
+        key = lambda i: (self.prices[i], self.ids[i])
+        if sort == "price_asc":
+            if not cursor:
+                return 0
+            return bisect.bisect_right(self.price_order, tuple(decode_cursor(cursor, (int, int))), key=key)
+        # price_desc walks price_order backwards: count rows strictly below the cursor
+        if not cursor:
+            return len(self.ids)
+        return bisect.bisect_left(self.price_order, tuple(decode_cursor(cursor, (int, int))), key=key)
+
+    def listing(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort: str = "id",
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        in_stock: Optional[bool] = None,
+        currency: Optional[str] = None,
+    ) -> list[ProductRow]:
+        # Same rows as build_listing_query: one page plus one extra row to detect a next page
+        code = None
+        if currency:
+            if currency.upper() not in self.currencies:
+                return []
+            code = self.currencies.index(currency.upper())
+
+        start = self._start(sort, cursor)
+        if np is not None:
+            positions = self._select_numpy(limit + 1, start, sort, min_price, max_price, in_stock, code)
+        else:
+            positions = self._select_loop(limit + 1, start, sort, min_price, max_price, in_stock, code)
+        return [self.row(i) for i in positions]
+
+    def _select_numpy(self, count, start, sort, min_price, max_price, in_stock, code) -> list[int]:
+        # Boolean mask over the whole catalog, then the first matches in sort order
+        prices = np.frombuffer(self.prices, dtype=np.int64)
+        mask = np.ones(len(prices), dtype=bool)
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        if in_stock is not None:
+            stocks = np.frombuffer(self.stocks, dtype=np.int64)
+            mask &= (stocks > 0) if in_stock else (stocks <= 0)
+        if code is not None:
+            mask &= np.frombuffer(self.currency_codes, dtype=np.uint8) == code
+
+        if sort == "id":
+            return (np.flatnonzero(mask[start:])[:count] + start).tolist()
+        order = np.frombuffer(self.price_order, dtype=np.int64)
+        order = order[start:] if sort == "price_asc" else order[:start][::-1]
+        return order[mask[order]][:count].tolist()
+
+    def _select_loop(self, count, start, sort, min_price, max_price, in_stock, code) -> list[int]:
+        # Pure Python fallback: walk the sort order until count rows matched
+        if sort == "id":
+            order: Iterable[int] = range(start, len(self.ids))
+        elif sort == "price_asc":
+            order = self.price_order[start:]
+        else:
+            order = reversed(self.price_order[:start])
+
+        found = []
+        for i in order:
+            price = self.prices[i]
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+            if in_stock is not None and (self.stocks[i] > 0) != in_stock:
+                continue
+            if code is not None and self.currency_codes[i] != code:
+                continue
+            found.append(i)
+            if len(found) == count:
+                break
+        return found
+
+    def memory_bytes(self) -> int:
+        # Arrays plus the Python strings and lists (interned titles counted once)
+        arrays = (self.ids, self.prices, self.stocks, self.currency_codes, self.price_order)
+        total = sum(sys.getsizeof(a) for a in arrays)
+        total += sum(sys.getsizeof(lst) for lst in (self.titles, self.descriptions, self.slugs))
+        total += sum(sys.getsizeof(s) for s in {id(t): t for t in self.titles}.values())
+        total += sum(sys.getsizeof(s) for s in self.descriptions if s is not None)
+        total += sum(sys.getsizeof(s) for s in self.slugs)
+        return total
+
+    def stats(self) -> dict:
+        memory = self.memory_bytes()
+        per_product = memory / len(self) if len(self) else 0
+        return {
+            "products": len(self),
+            "version": self.version,
+            "built_at": self.built_at,
+            "vectorized": np is not None,
+            "memory_bytes": memory,
+            "bytes_per_product": round(per_product, 1),
+            "memory_bytes_per_100k_products": round(per_product * 100_000),
+        }
+
+
+def load_snapshot(engine: Engine, version: int = 1) -> CatalogSnapshot:
+    columns = [getattr(Product, c) for c in _COLUMNS]
+    with Session(engine) as session:
+        rows = session.exec(select(*columns).order_by(Product.id)).all()
+    return CatalogSnapshot.from_rows(rows, version)
+
+
+class SnapshotRefresher:
+    """
+    Keeps the current snapshot in step with product writes. invalidate()
+    (called from invalidate_products, on any thread or the event loop) only
+    records the changed ids; a background thread reloads those rows, patches
+    the stock column when only stock changed, or rebuilds the snapshot
+    otherwise, then swaps it in with a new version. Cached listing pages
+    are keyed by version, so pages of the old snapshot are never served
+    again and age out of the listing cache.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.current: Optional[CatalogSnapshot] = None
+        self.patches = 0
+        self.rebuilds = 0
+        self._pending: set[int] = set()
+        self._rebuild = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self.current = load_snapshot(self.engine)
+        self._thread = threading.Thread(target=self._loop, name="catalog-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def invalidate(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        with self._lock:
+            if product_ids is None:
+                self._rebuild = True
+            else:
+                self._pending.update(product_ids)
+        self._wakeup.set()
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            time.sleep(SNAPSHOT_REFRESH_DELAY)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+                self.invalidate(None)
+                time.sleep(1)
+
+    def refresh(self) -> None:
+        with self._lock:
+            ids, rebuild = self._pending, self._rebuild
+            self._pending, self._rebuild = set(), False
+        if not ids and not rebuild:
+            return
+
+        snapshot = self.current
+        if not rebuild and snapshot is not None:
+            patched = self._patch(snapshot, ids)
+            if patched is not None:
+                self.current = patched
+                self.patches += 1
+                return
+
+        version = snapshot.version + 1 if snapshot is not None else 1
+        self.current = load_snapshot(self.engine, version)
+        self.rebuilds += 1
+
+    def _patch(self, snapshot: CatalogSnapshot, ids: set[int]) -> Optional[CatalogSnapshot]:
+        # Stock-only changes become a patched copy; anything else (None) needs a rebuild
+        columns = [getattr(Product, c) for c in _COLUMNS]
+        with Session(self.engine) as session:
+            rows = session.exec(select(*columns).where(Product.id.in_(list(ids)))).all()
+        if len(rows) != len(ids):
+            return None  # deleted products
+
+        changes = {}
+        for row in rows:
+            i = snapshot.position(row.id)
+            if i is None:
+                return None  # new product
+            current = snapshot.row(i)
+            if ProductRow(*row)._replace(stock=current.stock) != current:
+                return None  # price, currency or text changed
+            if row.stock != current.stock:
+                changes[i] = row.stock
+        return snapshot.with_stock(changes) if changes else snapshot
+
+    def stats(self) -> dict:
+        snapshot = self.current
+        return {
+            **(snapshot.stats() if snapshot is not None else {"products": 0}),
+            "patches": self.patches,
+            "rebuilds": self.rebuilds,
+        }
+
+
+_refresher: Optional[SnapshotRefresher] = None
+
+
+def start_snapshot(engine: Engine) -> SnapshotRefresher:
+    global _refresher
+    if _refresher is None:
+        _refresher = SnapshotRefresher(engine)
+        add_invalidation_listener(invalidate_snapshot)
+    _refresher.start()
+    return _refresher
+
+
+def stop_snapshot() -> None:
+    if _refresher is not None:
+        _refresher.stop()
+
+
+def current_snapshot() -> Optional[CatalogSnapshot]:
+    # None when the read engine is off or not built yet: callers fall back to SQL
+    return _refresher.current if _refresher is not None else None
+
+
+def snapshot_stats() -> Optional[dict]:
+    return _refresher.stats() if _refresher is not None else None
+
+
+def invalidate_snapshot(product_ids: Optional[Iterable[int]] = None) -> None:
+    if _refresher is not None:
+        _refresher.invalidate(product_ids)
@@ -0,0 +1,125 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from sqlmodel import Session
+
+from app.db import create_db_and_tables, engine
+from app.search import rebuild_search_index
+from app.idempotency import purge_expired_keys
+from app.outbox import retry_failed_events
+from app.holds import sweep_expired
+from app.analytics import backfill
+from app.recommendations import rebuild as rebuild_recommendations
+from app.catalog_io import IMPORT_BATCH_SIZE, export_products, import_products, iter_rows
+
+
+def cmd_rebuild_search(args):
+    # Rebuild the product full-text index from the product table
+    create_db_and_tables()
+    rebuild_search_index(engine)
+    print("Search index rebuilt")
+
+
+def cmd_purge_idempotency_keys(args):
+    # Delete Idempotency-Key records past their retention window
+    create_db_and_tables()
+    removed = purge_expired_keys(engine)
+    print(f"Removed {removed} expired idempotency keys")
+
+
+def cmd_release_expired_holds(args):
+    # Give expired checkout stock holds back to stock (the app's sweeper does this while running)
+    create_db_and_tables()
+    released = sweep_expired(engine)
+    print(f"Released {released} expired stock holds")
+
+
+def cmd_retry_failed_events(args):
+    # Re-queue outbox events that ran out of attempts
+    create_db_and_tables()
+    requeued = retry_failed_events(engine)
+    print(f"Re-queued {requeued} failed outbox events")
+
+
+def cmd_backfill_analytics(args):
+    # Rebuild the sales rollups from the whole order history
+    create_db_and_tables()
+    print(json.dumps(backfill(engine), indent=2))
+
+
+def cmd_rebuild_related(args):
+    # Recount "frequently bought together" pairs from the whole order history
+    create_db_and_tables()
+    print(json.dumps(rebuild_recommendations(engine), indent=2))
+
+
+def catalog_format(path: str, format: str) -> str:
+    # Explicit --format, else guessed from the file extension
+    if format:
+        return format
+    return "ndjson" if Path(path).suffix.lower() in (".ndjson", ".jsonl") else "csv"
+
+
+def cmd_import_products(args):
+    # Bulk upsert products by slug from a CSV/NDJSON file ("-" reads stdin)
+    create_db_and_tables()
+    format = catalog_format(args.path, args.format)
+    source = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8-sig")
+    with source, Session(engine) as session:
+        report = import_products(session, iter_rows(source, format), args.batch_size)
+    print(json.dumps(report, indent=2))
+
+
+def cmd_export_products(args):
+    # Write the catalog as CSV/NDJSON to a file ("-" writes stdout)
+    create_db_and_tables()
+    format = catalog_format(args.path, args.format)
+    target = sys.stdout if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+    with Session(engine) as session:
+        for chunk in export_products(session, format):
+            target.write(chunk)
+    if target is not sys.stdout:
+        target.close()
+
+
+def main(argv=None):
+    # Maintenance commands: python -m app.cli <command>
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild-search", help="Rebuild the product full-text search index")
+    p.set_defaults(func=cmd_rebuild_search)
+
+    p = sub.add_parser("purge-idempotency-keys", help="Delete expired checkout Idempotency-Key records")
+    p.set_defaults(func=cmd_purge_idempotency_keys)
+
+    p = sub.add_parser("release-expired-holds", help="Give expired checkout stock holds back to stock")
+    p.set_defaults(func=cmd_release_expired_holds)
+
+    p = sub.add_parser("retry-failed-events", help="Re-queue outbox events that ran out of attempts")
+    p.set_defaults(func=cmd_retry_failed_events)
+
+    p = sub.add_parser("backfill-analytics", help="Rebuild the sales rollup tables from the order history")
+    p.set_defaults(func=cmd_backfill_analytics)
+
+    p = sub.add_parser("rebuild-related", help="Rebuild the frequently-bought-together index from the order history")
+    p.set_defaults(func=cmd_rebuild_related)
+
+    p = sub.add_parser("import-products", help="Bulk upsert products by slug from a CSV or NDJSON file")
+    p.add_argument("path", help='input file, or "-" for stdin')
+    p.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    p.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="rows per transaction")
+    p.set_defaults(func=cmd_import_products)
+
+    p = sub.add_parser("export-products", help="Export the catalog as CSV or NDJSON")
+    p.add_argument("path", nargs="?", default="-", help='output file, or "-" for stdout (default)')
+    p.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    p.set_defaults(func=cmd_export_products)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
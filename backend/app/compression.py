@@ -0,0 +1,114 @@
+import gzip
+import os
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.cache import TTLCache
+from app.db import env_flag
+
+# Response compression above a size threshold: brotli when the optional
+# "brotli" package is installed and the client accepts it, gzip otherwise
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSION_ENABLED = env_flag("COMPRESSION_ENABLED", "1")
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))     # bytes; smaller bodies are sent as is
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))              # fast levels suit dynamic responses
+COMPRESSED_CACHE_SIZE = int(os.getenv("COMPRESSED_CACHE_SIZE", "256"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Compressed bodies of responses with a strong ETag (the product caches), keyed
+# by (etag, encoding), so a hot cached page is compressed once, not per request
+compressed_cache = TTLCache(COMPRESSED_CACHE_SIZE, ttl=3600)
+
+
+def accepted_encoding(accept_encoding: str) -> Optional[str]:
+    # Pick "br" or "gzip" from an Accept-Encoding header (q=0 means refused)
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing complete (non-streaming) responses of
+    JSON/text types once they reach COMPRESS_MIN_SIZE. Streaming responses
+    such as the exports are passed through untouched. The ETag of a
+    compressed response is made weak (W/"..."), since the bytes differ but
+    the representation is the same, and If-None-Match still matches it.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            passthrough = True
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+            key = (etag, encoding) if etag and not etag.startswith("W/") else None
+            compressed = compressed_cache.get(key) if key else None
+            if compressed is None:
+                compressed = compress(body, encoding)
+                if key:
+                    compressed_cache.set(key, compressed)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            if key:
+                headers["ETag"] = "W/" + etag
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,16 +1,163 @@
-from sqlmodel import SQLModel, create_engine, Session
+import itertools
+import os
+import time
 from pathlib import Path
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.cache import TTLCache, add_invalidation_listener
 
 # Base directory of the current file
 BASE_DIR = Path(__file__).resolve().parent
 sqlite_file = BASE_DIR / "database.db"
 
-# Create SQLite engine
-engine = create_engine(
-    f"sqlite:///{sqlite_file}",
-    connect_args={"check_same_thread": False},  # Required for SQLite with multiple threads
-    echo=True,                                  # Log SQL queries (useful for debugging)
-)
+
+def env_flag(name: str, default: str = "0") -> bool:
+    # Read a boolean environment variable ("1", "true", "yes", "on")
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Database configuration (environment variables)
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{sqlite_file}")
+DB_ECHO = env_flag("DB_ECHO")                                   # Log every SQL statement (debug only)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))             # Persistent connections per process
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))       # Extra connections under bursts
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))     # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # Reconnect after N seconds (server databases)
+DB_ASYNC = env_flag("DB_ASYNC")                                 # Serve hot routes with async handlers
+DB_READ_POOL = env_flag("DB_READ_POOL")                         # Separate read-only connections for read routes
+DB_READ_REPLICAS = [u.strip() for u in os.getenv("DB_READ_REPLICAS", "").split(",") if u.strip()]  # replica URLs
+DB_READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))  # reads go to the primary after a user's write
+
+# Pragmas applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),            # readers don't block the writer
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),           # safe with WAL, one fsync per checkpoint
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),   # wait for the write lock instead of failing
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", str(-64 * 1024))),  # negative = KiB (64 MiB)
+    "temp_store": "MEMORY",
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _apply_sqlite_pragmas(engine: Engine, pragmas: dict) -> None:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL, pragmas: Optional[dict] = None, echo: bool = DB_ECHO) -> Engine:
+    # Create the engine for the configured database (SQLite file/memory or a server URL such as PostgreSQL)
+    if not is_sqlite(url):
+        return create_engine(
+            url,
+            echo=echo,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,  # Drop connections closed by the server or a proxy
+        )
+
+    connect_args = {"check_same_thread": False}  # Required for SQLite with multiple threads
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # A single shared connection, otherwise every connection gets its own empty database
+        engine = create_engine(url, echo=echo, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            echo=echo,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    _apply_sqlite_pragmas(engine, SQLITE_PRAGMAS if pragmas is None else pragmas)
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    # Swap the sync driver for its asyncio counterpart (aiosqlite / asyncpg)
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+
+def build_async_engine(url: str = DATABASE_URL, pragmas: Optional[dict] = None, echo: bool = DB_ECHO) -> AsyncEngine:
+    # Async counterpart of build_engine (same pool sizing and SQLite pragmas)
+    async_url = to_async_url(url)
+    if not is_sqlite(url):
+        return create_async_engine(
+            async_url,
+            echo=echo,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        async_engine = create_async_engine(async_url, echo=echo, poolclass=StaticPool)
+    else:
+        async_engine = create_async_engine(
+            async_url,
+            echo=echo,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    _apply_sqlite_pragmas(async_engine.sync_engine, SQLITE_PRAGMAS if pragmas is None else pragmas)
+    return async_engine
+
+
+def read_only_url(url: str) -> Optional[str]:
+    # Same SQLite file opened with mode=ro (None for in-memory databases, which can't be shared)
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return parsed.set(database=f"file:{parsed.database}", query={"mode": "ro", "uri": "true"}).render_as_string()
+
+
+def read_urls(url: str = DATABASE_URL) -> list[str]:
+    # Where read-only routes go: the configured replicas, or a read-only pool on the SQLite file
+    if DB_READ_REPLICAS:
+        return DB_READ_REPLICAS
+    if DB_READ_POOL and is_sqlite(url):
+        ro_url = read_only_url(url)
+        return [ro_url] if ro_url else []
+    return []
+
+
+# A read-only connection can't switch the journal mode (the primary already set it)
+SQLITE_READ_PRAGMAS = {k: v for k, v in SQLITE_PRAGMAS.items() if k != "journal_mode"}
+
+# Application engines (the async ones only exist in async mode: they need aiosqlite/asyncpg).
+# Read engines are empty unless DB_READ_POOL/DB_READ_REPLICAS is set; reads then use the primary.
+engine = build_engine()
+async_engine = build_async_engine() if DB_ASYNC else None
+read_engines = [build_engine(u, pragmas=SQLITE_READ_PRAGMAS) for u in read_urls()]
+async_read_engines = [build_async_engine(u, pragmas=SQLITE_READ_PRAGMAS) for u in read_urls()] if DB_ASYNC else []
 
 def create_db_and_tables():
     # Import models so they are registered in SQLModel metadata
@@ -18,11 +165,129 @@ def create_db_and_tables():
     import app.models.order
     import app.models.order_item
     import app.models.user
+    import app.models.idempotency
+    import app.models.outbox
+    import app.models.analytics
+    import app.models.recommendations
+    import app.models.hold
+
+    # The per-product daily rollup gained a currency key: rebuild it (it is derived
+    # from the orders) when the existing table predates it
+    rebuild_product_rollup = _drop_if_missing_column(engine, "productdailysales", "currency")
 
     # Create database tables if they do not exist
     SQLModel.metadata.create_all(engine)
+    if rebuild_product_rollup:
+        from app.analytics import backfill
+        backfill(engine)
+
+    # Databases created before the unique slug index may hold repeated slugs
+    if "ux_product_slug" not in {ix["name"] for ix in inspect(engine).get_indexes("product")}:
+        dedupe_product_slugs(engine)
+
+    # create_all skips tables that already exist, so add any index that was
+    # introduced after the table was first created
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    # Full-text search index over the catalog
+    from app.search import ensure_search_index
+    ensure_search_index(engine)
+
+def _drop_if_missing_column(engine: Engine, table: str, column: str) -> bool:
+    # Drop a derived table created before `column` existed, so create_all builds it again
+    inspector = inspect(engine)
+    if not inspector.has_table(table) or column in {c["name"] for c in inspector.get_columns(table)}:
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {table}"))
+    return True
+
+def dedupe_product_slugs(engine: Engine) -> int:
+    """
+    Make product slugs unique before the unique index is built: every
+    repeated slug except the lowest id gets "-<id>" appended. Rows are
+    renamed, not deleted, because order items reference them. Returns the
+    number of renamed products.
+    """
+    rename = text(
+        "UPDATE product SET slug = slug || '-' || CAST(id AS VARCHAR) "
+        "WHERE id NOT IN (SELECT MIN(id) FROM product GROUP BY slug)"
+    )
+    renamed = 0
+    with engine.begin() as conn:
+        # A new slug may itself collide with an existing one, so repeat until stable
+        while True:
+            count = conn.execute(rename).rowcount
+            if not count:
+                return renamed
+            renamed += count
 
 def get_session():
     # Provide a database session for request handling
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # Provide an async database session (DB_ASYNC mode)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+# Users who wrote (an order, a hold, a product edit) in the last
+# DB_READ_STICKY_SECONDS read from the primary, so their own write is visible
+# even when a replica lags behind. Keyed by the authenticated principal (the
+# Bearer token subject), not by a header any client can set; anonymous
+# requests are not sticky
+_recent_writers = TTLCache(10_000, DB_READ_STICKY_SECONDS)
+_read_turn = itertools.count()
+
+
+def mark_recent_write(principal: Optional[str]) -> None:
+    if principal and (read_engines or async_read_engines):
+        _recent_writers.set(principal, True)
+
+
+# Replicas may lag a product write (order, stock patch, admin edit) by up to
+# DB_READ_STICKY_SECONDS; what they return in that window is served but not
+# put in the shared product caches, or every user would keep the stale copy
+_last_product_write = 0.0
+
+
+def _product_written(product_ids) -> None:
+    global _last_product_write
+    _last_product_write = time.monotonic()
+
+
+add_invalidation_listener(_product_written)
+
+
+def cacheable_read(session) -> bool:
+    # Whether rows read through this (read) session may fill the shared caches
+    if not DB_READ_REPLICAS or session.bind in (engine, async_engine):
+        return True  # the primary, or read-only connections to the same SQLite file
+    return time.monotonic() - _last_product_write >= DB_READ_STICKY_SECONDS
+
+
+def _pick(engines: list, primary, request: Request):
+    # Round-robin over the read engines, or the primary for recent writers
+    if not engines:
+        return primary
+    from app.auth import bearer_subject  # app.auth imports this module
+    principal = bearer_subject(request.headers)
+    if principal and _recent_writers.get(principal):
+        return primary
+    return engines[next(_read_turn) % len(engines)]
+
+
+def get_read_session(request: Request):
+    # Session for read-only handlers (catalog, order history): a read connection or replica
+    with Session(_pick(read_engines, engine, request)) as session:
+        yield session
+
+async def get_async_read_session(request: Request):
+    # Async twin of get_read_session (DB_ASYNC mode)
+    bind = _pick(async_read_engines, async_engine, request)
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
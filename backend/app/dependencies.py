@@ -1,7 +1,15 @@
 from typing import Annotated
 from fastapi import Depends
 from sqlmodel import Session
-from app.db import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_read_session, get_async_session, get_read_session, get_session
 
 # Dependency alias to inject a database session into route handlers
 SessionDep = Annotated[Session, Depends(get_session)]
+
+# Async session for the async route handlers (DB_ASYNC mode)
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+# Sessions for read-only handlers: read connections/replicas when configured
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_session)]
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.cache import invalidate_products
+from app.db import env_flag
+from app.ordering import place_order
+
+# Group commit for POST /orders/ (opt-in): requests hand their order to one
+# writer thread, which places every order waiting in the queue inside a
+# single transaction (one savepoint per order, so a failed order only undoes
+# itself) and commits once. On SQLite that is one write lock and one WAL
+# sync for the whole batch instead of one per order.
+ORDER_GROUP_COMMIT = env_flag("ORDER_GROUP_COMMIT")                           # off by default
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))       # orders per transaction
+GROUP_COMMIT_MAX_WAIT = float(os.getenv("GROUP_COMMIT_MAX_WAIT_MS", "0")) / 1000  # wait for more orders, 0 = none
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OrderRequest:
+    user_email: str
+    items: list[dict]
+    hold_id: Optional[str] = None
+    future: Future = field(default_factory=Future)
+
+
+class OrderWriter:
+    """
+    Single writer thread placing queued orders in batches. Each caller's
+    future resolves to its order summary once the batch is committed, or
+    to the exception that rejected its order (HTTPException for an invalid
+    cart or missing stock, as with the per-request path).
+    """
+
+    def __init__(self, engine: Engine, max_batch: int = GROUP_COMMIT_MAX_BATCH, max_wait: float = GROUP_COMMIT_MAX_WAIT):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.orders = 0
+        self._queue: queue.Queue[Optional[OrderRequest]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        # Orders already queued are still placed before the thread exits
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(10)
+            self._thread = None
+
+    def submit(self, user_email: str, items: list[dict], hold_id: Optional[str] = None) -> Future:
+        request = OrderRequest(user_email, items, hold_id)
+        self._queue.put(request)
+        return request.future
+
+    def _next_batch(self) -> tuple[list[OrderRequest], bool]:
+        # Block for the first order, then take what else is queued (up to max_batch)
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                try:
+                    self.apply(batch)
+                except Exception as exc:
+                    logger.exception("Order batch failed")
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_exception(exc)
+
+    def apply(self, batch: list[OrderRequest]) -> None:
+        placed = []
+        with Session(self.engine) as session:
+            if self.engine.dialect.name == "sqlite":
+                # Explicit BEGIN so the savepoints nest inside one transaction
+                # (pysqlite would otherwise commit at the first RELEASE); IMMEDIATE
+                # takes the write lock up front
+                session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+            for request in batch:
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with session.begin_nested():
+                        order, touched = place_order(session, request.user_email, request.items, request.hold_id)
+                except Exception as exc:
+                    request.future.set_exception(exc)
+                    continue
+                summary = {
+                    "id": order.id,
+                    "status": order.status,
+                    "total_cents": order.total_cents,
+                    "currency": order.currency,
+                }
+                placed.append((request, summary, touched))
+
+            session.commit()
+
+        self.batches += 1
+        self.orders += len(placed)
+        # Stock changed for every product in the batch (lines and returned hold units)
+        if placed:
+            invalidate_products({pid for _, _, touched in placed for pid in touched}, columns=["stock"])
+        for request, summary, _ in placed:
+            request.future.set_result(summary)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "orders": self.orders,
+            "avg_batch": round(self.orders / self.batches, 2) if self.batches else 0,
+            "queued": self._queue.qsize(),
+        }
+
+
+_writer: Optional[OrderWriter] = None
+
+
+def start_order_writer(engine: Engine) -> OrderWriter:
+    global _writer
+    if _writer is None:
+        _writer = OrderWriter(engine)
+    _writer.start()
+    return _writer
+
+
+def stop_order_writer() -> None:
+    if _writer is not None:
+        _writer.stop()
+
+
+def get_order_writer() -> Optional[OrderWriter]:
+    return _writer
+
+
+async def submit_order(user_email: str, items: list[dict], hold_id: Optional[str] = None) -> dict:
+    # Queue an order and wait (without holding a thread) until its batch is committed
+    if _writer is None:
+        raise RuntimeError("Order writer is not running")
+    return await asyncio.wrap_future(_writer.submit(user_email, items, hold_id))
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+# Password hashing runs on a dedicated, size-limited pool so a burst of logins
+# cannot take over the request threadpool. bcrypt releases the GIL while it
+# hashes, so worker threads run in parallel on separate cores.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # running + queued
+
+
+class PasswordHasherBusy(Exception):
+    # Raised when the hashing queue is full (callers answer 503 + Retry-After)
+    pass
+
+
+class HashPool:
+    # Bounded executor for CPU-heavy password work, with queue and latency counters
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0      # submitted and not finished (running + queued)
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0   # time spent queued
+        self.hash_seconds_total = 0.0   # time spent hashing
+        self.hash_seconds_max = 0.0
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+
+        submitted = time.perf_counter()
+        try:
+            future = self._executor.submit(self._run, submitted, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Runs on completion and also when a queued call is cancelled (client went away)
+        future.add_done_callback(lambda f: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn: Callable, *args):
+        # Await the result without blocking the event loop or a request thread
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _run(self, submitted: float, fn: Callable, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self.wait_seconds_total += started - submitted
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.hash_seconds_total += elapsed
+                self.hash_seconds_max = max(self.hash_seconds_max, elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self.pending - self.running,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds_total / done * 1000, 2),
+                "avg_hash_ms": round(self.hash_seconds_total / done * 1000, 2),
+                "max_hash_ms": round(self.hash_seconds_max * 1000, 2),
+            }
+
+
+hash_pool = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
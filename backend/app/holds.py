@@ -0,0 +1,248 @@
+import logging
+import math
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, func
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.cache import invalidate_products
+from app.models.hold import StockHold
+from app.models.product import Product
+from app.stock import reserve_stock
+
+# Stock holds: POST /checkout/hold takes the cart's quantities off
+# Product.stock (the same conditional UPDATE as an order) and records them in
+# the stockhold table for a few minutes. Orders that pass the hold_id consume
+# it instead of reserving again; the sweeper gives expired holds back.
+HOLD_MINUTES = int(os.getenv("HOLD_MINUTES", "10"))                       # default hold length
+MAX_HOLD_MINUTES = int(os.getenv("MAX_HOLD_MINUTES", "30"))
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "5"))        # seconds between sweeps
+HOLD_SWEEP_BATCH = int(os.getenv("HOLD_SWEEP_BATCH", "500"))              # holds released per transaction
+
+logger = logging.getLogger(__name__)
+
+_table = Product.__table__
+
+
+def _return_statement():
+    # executemany: stock += qty per product
+    return (
+        _table.update()
+        .where(_table.c.id == bindparam("b_id"))
+        .values(stock=_table.c.stock + bindparam("b_qty"))
+    )
+
+
+def _return_rows(amounts: dict[int, int]) -> list[dict]:
+    return [{"b_id": pid, "b_qty": qty} for pid, qty in sorted(amounts.items()) if qty > 0]
+
+
+def _take_statement(hold_id: Optional[str], user_email: str):
+    # Delete a user's hold (or all their holds) and return what it held. Each
+    # row is deleted exactly once, so an order and the sweeper can never both
+    # get the same units. Expired holds not swept yet still count: their
+    # stock has not been given back.
+    stmt = delete(StockHold).where(StockHold.user_email == user_email)
+    if hold_id is not None:
+        stmt = stmt.where(StockHold.hold_id == hold_id)
+    return stmt.returning(StockHold.product_id, StockHold.quantity).execution_options(synchronize_session=False)
+
+
+def _held(rows) -> dict[int, int]:
+    held: dict[int, int] = {}
+    for pid, qty in rows:
+        held[pid] = held.get(pid, 0) + qty
+    return held
+
+
+def split_lines(lines: dict[int, int], held: dict[int, int]) -> tuple[dict[int, int], dict[int, int]]:
+    # (quantities still to reserve, held quantities to give back) for an order using a hold
+    missing: dict[int, int] = {}
+    surplus = dict(held)
+    for pid, qty in lines.items():
+        extra = qty - surplus.pop(pid, 0)
+        if extra > 0:
+            missing[pid] = extra
+        elif extra < 0:
+            surplus[pid] = -extra
+    return missing, surplus
+
+
+def consume_hold(
+    session: Session, hold_id: str, user_email: str, lines: dict[int, int]
+) -> tuple[dict[int, int], list[int]]:
+    """
+    Use a hold for an order (inside the order's transaction). Returns the
+    quantities the order still has to reserve (lines not covered by the
+    hold, or everything if the hold is gone) and the ids of products whose
+    held units the order does not need: those go back to stock, so their
+    cached stock must be invalidated too.
+    """
+    held = _held(session.execute(_take_statement(hold_id, user_email)).all())
+    missing, surplus = split_lines(lines, held)
+    rows = _return_rows(surplus)
+    if rows:
+        session.execute(_return_statement(), rows)
+    return missing, [row["b_id"] for row in rows]
+
+
+async def consume_hold_async(
+    session: AsyncSession, hold_id: str, user_email: str, lines: dict[int, int]
+) -> tuple[dict[int, int], list[int]]:
+    # Async twin of consume_hold
+    held = _held((await session.execute(_take_statement(hold_id, user_email))).all())
+    missing, surplus = split_lines(lines, held)
+    rows = _return_rows(surplus)
+    if rows:
+        await session.execute(_return_statement(), rows)
+    return missing, [row["b_id"] for row in rows]
+
+
+def release_holds(session: Session, user_email: str, hold_id: Optional[str] = None) -> dict[int, int]:
+    # Give a user's hold (default: all their holds) back to stock; returns {product_id: quantity}
+    held = _held(session.execute(_take_statement(hold_id, user_email)).all())
+    if held:
+        session.execute(_return_statement(), _return_rows(held))
+    return held
+
+
+def retry_after_query(product_ids: list[int]):
+    return select(func.min(StockHold.expires_at)).where(StockHold.product_id.in_(product_ids))
+
+
+def retry_after_seconds(next_expiry: Optional[datetime]) -> Optional[int]:
+    # When held units of a sold-out product may come back (expiry + one sweep)
+    if next_expiry is None:
+        return None
+    seconds = (next_expiry - datetime.utcnow()).total_seconds() + HOLD_SWEEP_INTERVAL
+    return max(1, math.ceil(seconds))
+
+
+def stock_conflict(errors: list[dict], next_expiry: Optional[datetime]) -> HTTPException:
+    # 409 with the stock errors, plus Retry-After when holds may free some of the stock
+    retry_after = retry_after_seconds(next_expiry)
+    headers = {"Retry-After": str(retry_after)} if retry_after else None
+    return HTTPException(status_code=409, detail={"errors": errors}, headers=headers)
+
+
+def place_hold(session: Session, user_email: str, lines: dict[int, int], minutes: int) -> tuple[str, datetime]:
+    """
+    Hold the cart's quantities for `minutes` (flushed, not committed: the
+    caller commits). Raises a 409 (with Retry-After when other holds may
+    free stock) if any line can't be held, after rolling back.
+    """
+    errors = reserve_stock(session, lines)
+    if errors:
+        session.rollback()
+        failed = [e["product_id"] for e in errors]
+        raise stock_conflict(errors, session.exec(retry_after_query(failed)).one())
+
+    hold_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(minutes=minutes)
+    session.add_all(
+        StockHold(hold_id=hold_id, user_email=user_email, product_id=pid, quantity=qty, expires_at=expires_at)
+        for pid, qty in lines.items()
+    )
+    session.flush()
+    return hold_id, expires_at
+
+
+def sweep_expired(engine: Engine, batch_size: int = HOLD_SWEEP_BATCH) -> int:
+    # Give expired holds back to stock, oldest first, one transaction per batch; returns holds released
+    released = 0
+    while True:
+        with Session(engine) as session:
+            now = datetime.utcnow()
+            ids = session.exec(
+                select(StockHold.id)
+                .where(StockHold.expires_at <= now)
+                .order_by(StockHold.expires_at)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                return released
+            rows = session.execute(
+                delete(StockHold)
+                .where(StockHold.id.in_(ids), StockHold.expires_at <= now)
+                .returning(StockHold.product_id, StockHold.quantity)
+                .execution_options(synchronize_session=False)
+            ).all()
+            amounts = _held(rows)
+            if amounts:
+                session.execute(_return_statement(), _return_rows(amounts))
+            session.commit()
+
+        released += len(rows)
+        if amounts:
+            invalidate_products(amounts, columns=["stock"])
+        if len(ids) < batch_size:
+            return released
+
+
+class HoldSweeper:
+    # Background thread running sweep_expired every HOLD_SWEEP_INTERVAL seconds
+
+    def __init__(self, engine: Engine, interval: float = HOLD_SWEEP_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.released = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="hold-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.released += sweep_expired(self.engine)
+            except Exception:
+                logger.exception("Stock hold sweep failed")
+
+    def stats(self) -> dict:
+        with Session(self.engine) as session:
+            holds, units, next_expiry = session.exec(
+                select(func.count(func.distinct(StockHold.hold_id)), func.sum(StockHold.quantity), func.min(StockHold.expires_at))
+            ).one()
+        return {
+            "active_holds": holds,
+            "held_units": units or 0,
+            "next_expiry": next_expiry.isoformat() if next_expiry else None,
+            "released_by_sweeper": self.released,
+        }
+
+
+_sweeper: Optional[HoldSweeper] = None
+
+
+def start_sweeper(engine: Engine) -> HoldSweeper:
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = HoldSweeper(engine)
+    _sweeper.start()
+    return _sweeper
+
+
+def stop_sweeper() -> None:
+    if _sweeper is not None:
+        _sweeper.stop()
+
+
+def get_sweeper() -> Optional[HoldSweeper]:
+    return _sweeper
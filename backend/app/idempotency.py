@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.models.idempotency import IdempotencyKey
+
+# Idempotency-Key support for the checkout endpoint
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def check_key(key: Optional[str]) -> Optional[str]:
+    # Normalize the header value (None when absent)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key header")
+    return key
+
+
+def request_fingerprint(lines: dict[int, int]) -> str:
+    # Hash of the normalized cart, to detect a key reused with another payload
+    canonical = json.dumps(sorted(lines.items()), separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def stored_key_query(user_email: str, key: str):
+    # Stored response for this key, ignoring records past their retention
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    return select(IdempotencyKey).where(
+        IdempotencyKey.user_email == user_email,
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at >= cutoff,
+    )
+
+
+def expired_key_statement(user_email: str, key: str):
+    # Drop a record of this key past its retention (not purged yet), so the key
+    # can be recorded again in the new order's transaction
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    return delete(IdempotencyKey).where(
+        IdempotencyKey.user_email == user_email,
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at < cutoff,
+    )
+
+
+def replay(stored: IdempotencyKey, request_hash: str) -> Response:
+    # Send back the stored response without touching anything else
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different cart")
+    return Response(
+        content=stored.response_body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def remember(user_email: str, key: str, request_hash: str, status_code: int, body: dict) -> IdempotencyKey:
+    # Record to insert in the same transaction as the order it describes
+    return IdempotencyKey(
+        user_email=user_email,
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response_body=json.dumps(body, separators=(",", ":")),
+    )
+
+
+def purge_expired_keys(engine: Engine) -> int:
+    # Delete records older than the retention window; returns how many were removed
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    with Session(engine) as session:
+        result = session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+        session.commit()
+        return result.rowcount
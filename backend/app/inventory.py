@@ -0,0 +1,111 @@
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, update
+from sqlmodel import Session
+
+from app.models.product import Product
+from app.stock import load_stock
+
+# Bulk stock/price updates pushed by inventory sync jobs
+PATCH_ATTEMPTS = int(os.getenv("PATCH_ATTEMPTS", "3"))   # tries when concurrent orders move stock mid-batch
+
+_table = Product.__table__
+
+
+def check_patches(patches: list[dict]) -> list[dict]:
+    # Shape errors that do not need the database
+    errors = []
+    seen = set()
+    for patch in patches:
+        pid = patch["id"]
+        if pid in seen:
+            errors.append({"product_id": pid, "reason": "DUPLICATE_ID"})
+        elif patch["stock"] is None and patch["stock_delta"] is None and patch["price_cents"] is None:
+            errors.append({"product_id": pid, "reason": "EMPTY_UPDATE"})
+        elif patch["stock"] is not None and patch["stock_delta"] is not None:
+            errors.append({"product_id": pid, "reason": "STOCK_AND_DELTA"})
+        elif (patch["stock"] or 0) < 0 or (patch["price_cents"] or 0) < 0:
+            errors.append({"product_id": pid, "reason": "NEGATIVE_VALUE"})
+        seen.add(pid)
+    return errors
+
+
+def negative_stock_errors(patches: list[dict], stock_map: dict[int, int]) -> list[dict]:
+    # Deltas that would take stock below zero
+    return [
+        {
+            "product_id": p["id"],
+            "reason": "NEGATIVE_STOCK",
+            "stock": stock_map[p["id"]],
+            "stock_delta": p["stock_delta"],
+        }
+        for p in patches
+        if p["stock_delta"] is not None and stock_map[p["id"]] + p["stock_delta"] < 0
+    ]
+
+
+def _set_statement(column: str):
+    return (
+        update(_table)
+        .where(_table.c.id == bindparam("b_id"))
+        .values({column: bindparam("b_value")})
+    )
+
+
+def _delta_statement():
+    # Relative change applied by the database: never overwrites concurrent order decrements
+    return (
+        update(_table)
+        .where(_table.c.id == bindparam("b_id"), _table.c.stock + bindparam("b_value") >= 0)
+        .values(stock=_table.c.stock + bindparam("b_value"))
+    )
+
+
+def _apply_once(session: Session, patches: list[dict]) -> tuple[list[dict], bool]:
+    # One attempt: (errors, conflict); conflict means a delta no longer fit when applied
+    stock_map = load_stock(session, [p["id"] for p in patches])
+    errors = [{"product_id": p["id"], "reason": "NOT_FOUND"} for p in patches if p["id"] not in stock_map]
+    if errors:
+        return errors, False
+    errors = negative_stock_errors(patches, stock_map)
+    if errors:
+        return errors, False
+
+    stock_rows = [{"b_id": p["id"], "b_value": p["stock"]} for p in patches if p["stock"] is not None]
+    price_rows = [{"b_id": p["id"], "b_value": p["price_cents"]} for p in patches if p["price_cents"] is not None]
+    delta_rows = [{"b_id": p["id"], "b_value": p["stock_delta"]} for p in patches if p["stock_delta"] is not None]
+
+    if stock_rows:
+        session.execute(_set_statement("stock"), stock_rows)
+    if price_rows:
+        session.execute(_set_statement("price_cents"), price_rows)
+    if delta_rows:
+        result = session.execute(_delta_statement(), delta_rows)
+        if result.rowcount != len(delta_rows):
+            return [], True
+    return [], False
+
+
+def apply_product_patches(session: Session, patches: list[dict]) -> tuple[int, list[dict]]:
+    """
+    Apply partial stock/price updates with one executemany UPDATE per kind
+    (absolute stock, stock delta, price) in the caller's transaction.
+    Returns (updated products, errors); on errors nothing was written (the
+    caller commits only when the list is empty). When orders change stock
+    between the check and the delta UPDATE, the batch is rolled back and
+    checked again against the new values (up to PATCH_ATTEMPTS times, then
+    409 with the products that have a delta).
+    """
+    errors = check_patches(patches)
+    if errors:
+        return 0, errors
+
+    for _ in range(PATCH_ATTEMPTS):
+        errors, conflict = _apply_once(session, patches)
+        if not conflict:
+            return (0, errors) if errors else (len(patches), [])
+        session.rollback()
+
+    conflicts = [{"product_id": p["id"], "reason": "CONFLICT"} for p in patches if p["stock_delta"] is not None]
+    raise HTTPException(status_code=409, detail={"errors": conflicts})
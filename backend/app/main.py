@@ -1,11 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.db import create_db_and_tables
+from app.db import DB_ASYNC, async_engine, async_read_engines, create_db_and_tables, engine
+from app.outbox import start_worker, stop_worker
+from app.catalog_snapshot import CATALOG_SNAPSHOT, start_snapshot, stop_snapshot
+from app.group_commit import ORDER_GROUP_COMMIT, start_order_writer, stop_order_writer
+from app.holds import start_sweeper, stop_sweeper
 from app.routes.products import router as products_router
 from app.routes.checkout import router as checkout_router
 from app.routes.orders import router as orders_router
 from app.routes.auth import router as auth_router
+from app.routes.analytics import router as analytics_router
+from app.metrics import METRICS_ENABLED, MetricsMiddleware, install_query_hooks, registry
+from app.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from app.profiling import PROFILING_ENABLED, ProfilingMiddleware, install_sql_capture
 
 # Create the FastAPI application instance
 app = FastAPI(
@@ -23,21 +32,89 @@ app.add_middleware(
     allow_credentials=False,         # Credentials not allowed
     allow_methods=["*"],             # Allow all HTTP methods
     allow_headers=["*"],             # Allow all headers
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile-Id"],  # Let the frontend read cursors, validators and profile ids
 )
 
+# gzip/brotli for JSON and text bodies above COMPRESS_MIN_SIZE
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Request profiling (opt-in, PROFILING_ENABLED=1): admin header/query parameter or PROFILE_SAMPLE_RATE
+if PROFILING_ENABLED:
+    install_sql_capture()
+    app.add_middleware(ProfilingMiddleware)
+
+# Per-route latency, status codes and SQL statements per request (outermost middleware)
+if METRICS_ENABLED:
+    install_query_hooks()
+    app.add_middleware(MetricsMiddleware)
+
 # Run on application startup
 @app.on_event("startup")
 def on_startup():
     # Create database and tables if they do not exist
     create_db_and_tables()
+    # Background workers for outbox events (order side work)
+    start_worker(engine)
+    # Gives expired checkout stock holds back to stock
+    start_sweeper(engine)
+    # In-memory column copy of the catalog for listings (opt-in)
+    if CATALOG_SNAPSHOT:
+        start_snapshot(engine)
+    # Single writer placing concurrent orders in shared transactions (opt-in)
+    if ORDER_GROUP_COMMIT:
+        start_order_writer(engine)
+
+# Stop the background workers and close pooled async connections on shutdown
+@app.on_event("shutdown")
+async def on_shutdown():
+    stop_order_writer()
+    stop_worker()
+    stop_sweeper()
+    stop_snapshot()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for read_engine in async_read_engines:
+        await read_engine.dispose()
 
 # Simple health check endpoint
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+# Prometheus scrape endpoint
+if METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# Group commit mode: POST /orders/ goes through the batching order writer
+if ORDER_GROUP_COMMIT:
+    from app.routes.orders_group import router as orders_group_router
+
+    app.include_router(orders_group_router, include_in_schema=False)
+
+# Async mode: async handlers are registered first so they take over the hot
+# paths; anything they don't implement falls through to the sync routers below.
+# They mirror the sync endpoints, so they are hidden from the OpenAPI schema.
+if DB_ASYNC:
+    from app.routes.auth_async import router as auth_async_router
+    from app.routes.products_async import router as products_async_router
+    from app.routes.checkout_async import router as checkout_async_router
+    from app.routes.orders_async import router as orders_async_router
+
+    app.include_router(auth_async_router, include_in_schema=False)
+    app.include_router(products_async_router, include_in_schema=False)
+    app.include_router(checkout_async_router, include_in_schema=False)
+    app.include_router(orders_async_router, include_in_schema=False)
+
 # Register API routers
 app.include_router(auth_router)      # Authentication routes
 app.include_router(products_router)  # Product catalog routes
 app.include_router(checkout_router)  # Cart validation / checkout routes
 app.include_router(orders_router)    # Orders and order history routes
+app.include_router(analytics_router) # Sales reports (admin only)
+
+if PROFILING_ENABLED:
+    from app.routes.profiles import router as profiles_router
+    app.include_router(profiles_router)  # Stored request profiles (admin only)
@@ -0,0 +1,207 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db import env_flag
+
+# Request and database metrics exposed at /metrics (Prometheus text format)
+METRICS_ENABLED = env_flag("METRICS_ENABLED", "1")
+
+# Histogram upper bounds (seconds for latency, statements for queries per request)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Label used for requests that matched no route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    # Cumulative-on-export histogram: one counter per bucket plus sum and count
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    # Statements run on behalf of one request (shared with worker threads via the context)
+    __slots__ = ("queries", "query_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Registry:
+    # All metric values, updated under one lock (a few dict operations per request)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: dict[tuple, int] = {}            # (method, route, status) -> count
+        self.latency: dict[tuple, Histogram] = {}       # (method, route) -> seconds
+        self.queries: dict[tuple, Histogram] = {}       # (method, route) -> statements per request
+        self.query_time: dict[tuple, float] = {}        # (method, route) -> seconds in the database
+        self.background_queries = 0                     # statements outside any request
+        self.background_query_time = 0.0
+
+    def start_request(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end_request(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.query_time[key] = self.query_time.get(key, 0.0) + stats.query_time
+
+    def record_background_query(self, elapsed: float) -> None:
+        with self._lock:
+            self.background_queries += 1
+            self.background_query_time += elapsed
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_in_flight Requests currently being served.",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total Completed requests by route and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method, route, status=status)} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), hist in sorted(self.latency.items()):
+                lines += _histogram_lines("http_request_duration_seconds", hist, method, route)
+
+            lines += [
+                "# HELP db_queries_per_request SQL statements executed per request, by route.",
+                "# TYPE db_queries_per_request histogram",
+            ]
+            for (method, route), hist in sorted(self.queries.items()):
+                lines += _histogram_lines("db_queries_per_request", hist, method, route)
+
+            lines += [
+                "# HELP db_query_duration_seconds_total Time spent executing SQL, by route.",
+                "# TYPE db_query_duration_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.query_time.items()):
+                lines.append(f"db_query_duration_seconds_total{_labels(method, route)} {seconds:.6f}")
+
+            lines += [
+                "# HELP db_background_queries_total SQL statements executed outside a request.",
+                "# TYPE db_background_queries_total counter",
+                f"db_background_queries_total {self.background_queries}",
+                "# HELP db_background_query_duration_seconds_total Time spent on SQL outside a request.",
+                "# TYPE db_background_query_duration_seconds_total counter",
+                f"db_background_query_duration_seconds_total {self.background_query_time:.6f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(method: str, route: str, **extra) -> str:
+    pairs = [("method", method), ("route", route), *extra.items()]
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _histogram_lines(name: str, hist: Histogram, method: str, route: str) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*hist.buckets, "+Inf"), hist.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(method, route, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(method, route)} {hist.sum:.6f}")
+    lines.append(f"{name}_count{_labels(method, route)} {hist.count}")
+    return lines
+
+
+registry = Registry()
+
+
+# Engine events are registered on the Engine class, so they cover every engine
+# (including the sync side of the async engine) without touching db.py
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is None:
+        registry.record_background_query(elapsed)
+    else:
+        stats.queries += 1
+        stats.query_time += elapsed
+
+
+def install_query_hooks() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_label(scope) -> str:
+    # Route template (e.g. /products/{product_id}) rather than the raw path
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    # Pure ASGI middleware: no extra task or body buffering per request
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = RequestStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.start_request()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            registry.end_request(scope["method"], route_label(scope), status, elapsed, stats)
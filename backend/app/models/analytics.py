@@ -0,0 +1,44 @@
+from datetime import date
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+# Sales rollups maintained by app.analytics from "order.placed" outbox events,
+# so reports read one row per day (or per product) instead of every order
+
+
+# Orders, revenue and units per UTC day and currency
+class DailySales(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    currency: str = Field(primary_key=True)
+
+    orders: int = 0
+    revenue_cents: int = 0
+    units: int = 0
+
+
+# Units and revenue per product, UTC day and order currency (top products over a date range)
+class ProductDailySales(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    product_id: int = Field(primary_key=True)
+    currency: str = Field(primary_key=True)
+
+    orders: int = 0
+    revenue_cents: int = 0
+    units: int = 0
+
+
+# All-time totals per product
+class ProductSales(SQLModel, table=True):
+    product_id: int = Field(primary_key=True)
+
+    orders: int = 0
+    revenue_cents: int = 0
+    units: int = 0
+
+
+# Orders with id <= backfilled_through were counted by the last backfill;
+# their events are skipped so nothing is counted twice
+class AnalyticsState(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    backfilled_through: Optional[int] = None
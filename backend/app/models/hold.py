@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+# Stock set aside for a customer's cart between validation and the order
+# (POST /checkout/hold). The quantity is already taken off Product.stock, so
+# available stock is read as before; an order consumes the hold, and the
+# sweeper in app.holds gives expired holds back to stock.
+class StockHold(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_stockhold_hold_id", "hold_id"),
+        Index("ix_stockhold_user_email", "user_email"),      # a user's holds (orders, release)
+        Index("ix_stockhold_expires_at", "expires_at"),      # sweeper scans oldest first
+        Index("ix_stockhold_product_expires", "product_id", "expires_at"),  # Retry-After on 409
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    hold_id: str                      # token returned to the client, shared by the cart's lines
+    user_email: str
+    product_id: int = Field(foreign_key="product.id")
+    quantity: int
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,14 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+# Stored result of a checkout made with an Idempotency-Key header.
+# A retry with the same key (and the same payload) replays this response
+# instead of placing the order again.
+class IdempotencyKey(SQLModel, table=True):
+    user_email: str = Field(primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+
+    request_hash: str                  # SHA-256 of the normalized cart
+    status_code: int                   # HTTP status of the stored response
+    response_body: str                 # JSON body of the stored response
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
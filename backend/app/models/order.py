@@ -1,12 +1,18 @@
 from typing import Optional, List, TYPE_CHECKING
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 
 if TYPE_CHECKING:
     from .order_item import OrderItem
 
 # Order database model
 class Order(SQLModel, table=True):
+    # Backs the per-user order history, paginated newest first on (created_at, id)
+    __table_args__ = (
+        Index("ix_order_user_email_created_at_id", "user_email", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     user_email: str = Field(index=True)  # Email of the user who placed the order
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+# Event written in the same transaction as the change it describes (e.g. an
+# order), then processed in the background by app.outbox workers
+class OutboxEvent(SQLModel, table=True):
+    # Workers pick due events: status in (pending, processing) and available_at <= now
+    __table_args__ = (
+        Index("ix_outboxevent_status_available_at", "status", "available_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    topic: str                                   # e.g. "order.placed"
+    payload: str                                 # JSON document handed to the handler
+    status: str = Field(default="pending")       # pending, processing or failed (done events are deleted)
+    attempts: int = 0
+    available_at: datetime = Field(default_factory=datetime.utcnow)  # next try, or end of the processing lease
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 
 # Base model shared by different Product schemas
@@ -8,11 +9,20 @@ class ProductBase(SQLModel):
     price_cents: int               # Price stored in cents to avoid floating point issues
     currency: str                  # Currency code (e.g. "USD", "EUR")
     stock: int                     # Current available stock
-    slug: str                      # URL-friendly unique identifier
+    slug: str                      # URL-friendly unique identifier (unique index ux_product_slug)
 
 
 # Database model
 class Product(ProductBase, table=True):
+    # Composite indexes backing the keyset-paginated catalog listing:
+    # sort by price (with id as tie-breaker), optionally filtered by currency
+    __table_args__ = (
+        Index("ix_product_price_cents_id", "price_cents", "id"),
+        Index("ix_product_currency_price_cents_id", "currency", "price_cents", "id"),
+        # Slug lookups for product pages, and the key of bulk imports
+        Index("ux_product_slug", "slug", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
 
@@ -0,0 +1,34 @@
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+# "Frequently bought together" index maintained by app.recommendations from
+# "order.placed" outbox events (and rebuilt from the order history by a batch job)
+
+
+# Number of orders containing both products (stored in both directions)
+class ProductPair(SQLModel, table=True):
+    # Top related products of one product: highest counts first
+    __table_args__ = (
+        Index("ix_productpair_product_orders", "product_id", "orders"),
+    )
+
+    product_id: int = Field(primary_key=True)
+    related_id: int = Field(primary_key=True)
+
+    orders: int = 0
+
+
+# Precomputed top-k per product, read by GET /products/{id}/related with one
+# primary key lookup
+class RelatedProducts(SQLModel, table=True):
+    product_id: int = Field(primary_key=True)
+    related: str                      # JSON list of product ids, most frequent first
+
+
+# Orders with id <= built_through were counted by the last rebuild;
+# their events are skipped so nothing is counted twice
+class RecommendationState(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    built_through: Optional[int] = None
@@ -0,0 +1,136 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.product import Product
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.stock import merge_lines, reserve_stock, reserve_stock_async
+from app.outbox import ORDER_PLACED, enqueue, order_placed_payload
+from app.holds import consume_hold, consume_hold_async, retry_after_query, stock_conflict
+
+# Order placement shared by POST /orders/ and the combined checkout endpoint.
+# place_order never commits: the caller owns the transaction, so it can add
+# more rows (e.g. an idempotency record) and commit everything at once.
+# Side work (alerts, analytics...) is queued as an "order.placed" outbox event
+# in that same transaction and runs in the background after the commit.
+
+
+def price_lines(lines: dict[int, int], products_map: dict) -> tuple[int, str]:
+    # Validate everything that does not depend on live stock (quantities were checked by
+    # _check_items); returns (total_cents, currency)
+    total_cents = 0
+    currency = None
+
+    for pid, qty in lines.items():
+        p = products_map.get(pid)
+        if not p:
+            raise HTTPException(status_code=404, detail=f"Product {pid} does not exist")
+
+        currency = currency or p.currency
+        if p.currency != currency:
+            raise HTTPException(status_code=400, detail="Mixed currencies are not supported")
+
+        total_cents += p.price_cents * qty
+
+    return total_cents, currency or "EUR"
+
+
+def build_order(user_email: str, total_cents: int, currency: str) -> Order:
+    return Order(
+        user_email=user_email,
+        status="paid",  # or "pending" if Stripe is added later
+        total_cents=total_cents,
+        currency=currency,
+        created_at=datetime.utcnow(),
+    )
+
+
+def build_order_items(order_id: int, lines: dict[int, int], products_map: dict) -> list[OrderItem]:
+    # One item per product, with the price snapshot taken at order time
+    return [
+        OrderItem(
+            order_id=order_id,
+            product_id=pid,
+            unit_price_cents=products_map[pid].price_cents,
+            quantity=qty,
+        )
+        for pid, qty in lines.items()
+    ]
+
+
+def _check_items(items: list[dict]) -> dict[int, int]:
+    if not items:
+        raise HTTPException(status_code=400, detail="Empty cart")
+    # Check each raw line before merging, so a negative line can't offset another
+    if any(int(it["quantity"]) < 1 for it in items):
+        raise HTTPException(status_code=400, detail="Invalid quantity")
+    return merge_lines(items)
+
+
+def place_order(
+    session: Session, user_email: str, items: list[dict], hold_id: Optional[str] = None
+) -> tuple[Order, set[int]]:
+    """
+    Validate the cart, reserve stock atomically and insert the order with its
+    items (flushed, not committed). With a hold_id, the units held for the
+    user (POST /checkout/hold) are used and only the rest is reserved.
+    Returns the order and the ids of every product whose stock changed
+    (order lines plus unused held units given back), to invalidate. Raises
+    HTTPException on any failure, after rolling back the reservation.
+    """
+    lines = _check_items(items)
+    products = session.exec(select(Product).where(Product.id.in_(list(lines)))).all()
+    products_map = {p.id: p for p in products}
+
+    # Validate everything that does not depend on live stock before writing anything
+    total_cents, currency = price_lines(lines, products_map)
+
+    # Short write transaction: reserve stock, insert the order and its items
+    to_reserve, returned = consume_hold(session, hold_id, user_email, lines) if hold_id else (lines, [])
+    errors = reserve_stock(session, to_reserve)
+    if errors:
+        # Inside a savepoint (group commit) its owner rolls back just this order
+        if not session.in_nested_transaction():
+            session.rollback()
+        next_expiry = session.exec(retry_after_query([e["product_id"] for e in errors])).one()
+        raise stock_conflict(errors, next_expiry)
+
+    order = build_order(user_email, total_cents, currency)
+    session.add(order)
+    session.flush()  # needed to get order.id
+
+    session.add_all(build_order_items(order.id, lines, products_map))
+    enqueue(session, ORDER_PLACED, order_placed_payload(order, lines))
+    session.flush()
+    return order, set(lines) | set(returned)
+
+
+async def place_order_async(
+    session: AsyncSession, user_email: str, items: list[dict], hold_id: Optional[str] = None
+) -> tuple[Order, set[int]]:
+    # Async twin of place_order
+    lines = _check_items(items)
+    products = (await session.exec(select(Product).where(Product.id.in_(list(lines))))).all()
+    products_map = {p.id: p for p in products}
+
+    total_cents, currency = price_lines(lines, products_map)
+
+    to_reserve, returned = await consume_hold_async(session, hold_id, user_email, lines) if hold_id else (lines, [])
+    errors = await reserve_stock_async(session, to_reserve)
+    if errors:
+        await session.rollback()
+        next_expiry = (await session.exec(retry_after_query([e["product_id"] for e in errors]))).one()
+        raise stock_conflict(errors, next_expiry)
+
+    order = build_order(user_email, total_cents, currency)
+    session.add(order)
+    await session.flush()
+
+    session.add_all(build_order_items(order.id, lines, products_map))
+    enqueue(session, ORDER_PLACED, order_placed_payload(order, lines))
+    await session.flush()
+    return order, set(lines) | set(returned)
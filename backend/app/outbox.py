@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, event, func, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from app.models.outbox import OutboxEvent
+from app.models.product import Product
+
+# Transactional outbox: request handlers add events to the outbox table in
+# their own transaction, and background worker threads run the side work
+# (alerts, analytics, emails...) after the commit, with retries
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))                   # 0 = events stay queued
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))            # events claimed per poll
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))     # seconds between idle polls
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))         # then the event is marked failed
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "2"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))    # a crashed worker's events come back after this
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", "5"))
+
+ORDER_PLACED = "order.placed"
+MAX_ERROR_LENGTH = 2000
+
+logger = logging.getLogger(__name__)
+
+# topic -> handlers(payload, session), run in registration order in one
+# transaction: their writes commit together with the removal of the event,
+# so a retry never applies them twice; other side effects must tolerate a retry
+Handler = Callable[[dict, Session], None]
+_handlers: dict[str, list[Handler]] = {}
+
+
+def handler(topic: str):
+    # Register a function that processes events of a topic
+    def register(fn: Handler) -> Handler:
+        _handlers.setdefault(topic, []).append(fn)
+        return fn
+    return register
+
+
+def enqueue(session, topic: str, payload: dict) -> None:
+    # Add an event to the caller's transaction (sync or async session); workers
+    # are woken up once it commits
+    session.add(OutboxEvent(topic=topic, payload=json.dumps(payload, separators=(",", ":"))))
+    session.info["outbox_pending"] = True
+
+
+def retry_delay(attempts: int) -> float:
+    # Exponential backoff: 2 s, 4 s, 8 s... with the default base
+    return OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+
+
+class OutboxWorker:
+    # Pool of daemon threads draining the outbox table
+
+    def __init__(self, engine: Engine, workers: int = OUTBOX_WORKERS):
+        self.engine = engine
+        self.workers = workers
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stopping.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"outbox-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                busy = self.run_once()
+            except Exception:
+                logger.exception("Outbox poll failed")
+                busy = 0
+            if not busy:
+                self._wakeup.wait(OUTBOX_POLL_INTERVAL)
+                self._wakeup.clear()
+
+    def claim(self) -> list[OutboxEvent]:
+        # Take a lease on due events with conditional UPDATEs, so two workers never share one
+        now = datetime.utcnow()
+        lease_end = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        claimed = []
+        with Session(self.engine, expire_on_commit=False) as session:
+            due = session.exec(
+                select(OutboxEvent)
+                .where(OutboxEvent.status.in_(("pending", "processing")), OutboxEvent.available_at <= now)
+                .order_by(OutboxEvent.available_at, OutboxEvent.id)
+                .limit(OUTBOX_BATCH_SIZE)
+            ).all()
+            for ev in due:
+                result = session.execute(
+                    update(OutboxEvent)
+                    .where(
+                        OutboxEvent.id == ev.id,
+                        OutboxEvent.status == ev.status,
+                        OutboxEvent.available_at == ev.available_at,
+                    )
+                    .values(status="processing", available_at=lease_end, attempts=OutboxEvent.attempts + 1)
+                )
+                if result.rowcount == 1:
+                    claimed.append(ev)  # the UPDATE also refreshed ev.attempts in the session
+            session.commit()
+        return claimed
+
+    def _leased(self, ev: OutboxEvent):
+        # Matches the event only while this worker's lease on it still holds
+        # (claim refreshed ev.status and ev.available_at to the lease values)
+        return (
+            OutboxEvent.id == ev.id,
+            OutboxEvent.status == "processing",
+            OutboxEvent.available_at == ev.available_at,
+        )
+
+    def process(self, ev: OutboxEvent) -> bool:
+        # Run the handler and delete the event in one transaction; on error schedule a retry
+        handlers = _handlers.get(ev.topic)
+        try:
+            if not handlers:
+                raise LookupError(f"No handler for topic {ev.topic!r}")
+            with Session(self.engine) as session:
+                payload = json.loads(ev.payload)
+                for fn in handlers:
+                    fn(payload, session)
+                result = session.execute(delete(OutboxEvent).where(*self._leased(ev)))
+                if result.rowcount != 1:
+                    # The lease ran out and another worker claimed the event:
+                    # drop this run's writes, the new owner applies them
+                    session.rollback()
+                    logger.warning("Outbox event %s (%s) lease lost, discarding this attempt", ev.id, ev.topic)
+                    return False
+                session.commit()
+        except Exception as e:
+            logger.warning("Outbox event %s (%s) failed on attempt %s: %r", ev.id, ev.topic, ev.attempts, e)
+            give_up = ev.attempts >= OUTBOX_MAX_ATTEMPTS
+            with Session(self.engine) as session:
+                session.execute(
+                    update(OutboxEvent)
+                    .where(*self._leased(ev))
+                    .values(
+                        status="failed" if give_up else "pending",
+                        available_at=datetime.utcnow() + timedelta(seconds=retry_delay(ev.attempts)),
+                        last_error=repr(e)[:MAX_ERROR_LENGTH],
+                    )
+                )
+                session.commit()
+            with self._lock:
+                if give_up:
+                    self.failed += 1
+                else:
+                    self.retried += 1
+            return False
+
+        with self._lock:
+            self.processed += 1
+        return True
+
+    def run_once(self) -> int:
+        # Claim and process one batch; returns how many events were claimed
+        events = self.claim()
+        for ev in events:
+            if self._stopping.is_set():
+                break  # unprocessed leases expire and the events are picked up again
+            self.process(ev)
+        return len(events)
+
+    def stats(self) -> dict:
+        with Session(self.engine) as session:
+            counts = dict(
+                session.exec(select(OutboxEvent.status, func.count()).group_by(OutboxEvent.status)).all()
+            )
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "pending": counts.get("pending", 0),
+                "processing": counts.get("processing", 0),
+                "failed": counts.get("failed", 0),
+                "processed": self.processed,
+                "retried": self.retried,
+                "gave_up": self.failed,
+            }
+
+
+def retry_failed_events(engine: Engine) -> int:
+    # Put events that ran out of attempts back in the queue
+    with Session(engine) as session:
+        result = session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.status == "failed")
+            .values(status="pending", attempts=0, available_at=datetime.utcnow())
+        )
+        session.commit()
+        return result.rowcount
+
+
+_worker: Optional[OutboxWorker] = None
+
+
+def start_worker(engine: Engine) -> OutboxWorker:
+    global _worker
+    if _worker is None:
+        _worker = OutboxWorker(engine)
+    _worker.start()
+    return _worker
+
+
+def stop_worker() -> None:
+    if _worker is not None:
+        _worker.stop()
+
+
+def get_worker() -> Optional[OutboxWorker]:
+    return _worker
+
+
+# Wake the workers as soon as a transaction carrying events commits
+@event.listens_for(OrmSession, "after_commit")
+def _notify_workers(session) -> None:
+    if session.info.pop("outbox_pending", False) and _worker is not None:
+        _worker.notify()
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_events(session) -> None:
+    session.info.pop("outbox_pending", None)
+
+
+def order_placed_payload(order, lines: dict[int, int]) -> dict:
+    return {
+        "order_id": order.id,
+        "user_email": order.user_email,
+        "total_cents": order.total_cents,
+        "currency": order.currency,
+        "created_at": order.created_at.isoformat(),
+        "lines": {str(pid): qty for pid, qty in lines.items()},
+    }
+
+
+@handler(ORDER_PLACED)
+def alert_low_stock(payload: dict, session: Session) -> None:
+    # Log products of the order whose remaining stock fell to LOW_STOCK_THRESHOLD or below
+    ids = [int(pid) for pid in payload["lines"]]
+    rows = session.exec(
+        select(Product.id, Product.stock).where(Product.id.in_(ids), Product.stock <= LOW_STOCK_THRESHOLD)
+    ).all()
+    for pid, stock in rows:
+        logger.warning("Low stock: product %s has %s left after order %s", pid, stock, payload["order_id"])
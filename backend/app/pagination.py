@@ -0,0 +1,35 @@
+import base64
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+# Response header carrying the opaque cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list[Any]) -> str:
+    # Encode the keyset values of the last row into an opaque, URL-safe token
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def next_cursor_headers(next_cursor: Optional[str]) -> dict:
+    # Response headers of a page: X-Next-Cursor unless it is the last one
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
+
+def decode_cursor(cursor: str, types: tuple[type, ...]) -> list[Any]:
+    # Decode a cursor created by encode_cursor and check it holds one value of each expected type
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # bool is an int subclass in Python, but never a valid keyset value
+    if any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(values, types)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
@@ -0,0 +1,359 @@
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.auth import bearer_subject, cached_user, is_admin_user, remember_user
+from app.db import engine, env_flag
+from app.metrics import route_label
+from app.models.user import User
+
+# Opt-in request profiling (PROFILING_ENABLED=1): admins then ask for it per request
+# (X-Profile header or ?profile= query parameter), and PROFILE_SAMPLE_RATE profiles a share of all requests
+PROFILING_ENABLED = env_flag("PROFILING_ENABLED")                            # off by default
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))          # 0..1, 0 = only on request
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))           # profiles kept in memory
+PROFILE_DEFAULT_MODE = os.getenv("PROFILE_MODE", "cprofile")                # for sampled requests
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1")) / 1000
+MAX_PROFILE_QUERIES = 500                                                   # SQL statements kept per profile
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+ProfileMode = Literal["cprofile", "sample"]
+PROFILE_MODES = ("cprofile", "sample")
+
+# What a profile covers: cProfile cannot be limited to one request (on Python
+# 3.12+ it hooks sys.monitoring for every thread), so its stats also include
+# any other request running at the same time; the stack sampler only records
+# the threads serving the profiled request
+PROFILE_SCOPES = {"cprofile": "process", "sample": "request"}
+
+
+@dataclass
+class ProfileRecord:
+    id: int
+    method: str
+    path: str
+    mode: ProfileMode
+    trigger: str                     # "admin" or "sampled"
+    started_at: float
+    route: str = ""
+    status: int = 500
+    duration: float = 0.0
+    queries: list = field(default_factory=list)     # [{"sql", "seconds"}]
+    dropped_queries: int = 0
+    stats: Optional[dict] = None                    # pstats data (cprofile mode)
+    speedscope: Optional[dict] = None               # sampled stacks (sample mode)
+
+    @property
+    def scope(self) -> str:
+        # "process" (cprofile: every thread) or "request" (sample: the request's threads)
+        return PROFILE_SCOPES[self.mode]
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "mode": self.mode,
+            "scope": self.scope,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration, 6),
+            "queries": len(self.queries) + self.dropped_queries,
+            "query_seconds": round(sum(q["seconds"] for q in self.queries), 6),
+        }
+
+
+class ProfileBuffer:
+    # Last PROFILE_BUFFER_SIZE profiles (oldest dropped first)
+
+    def __init__(self, maxsize: int):
+        self._records: deque[ProfileRecord] = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, record: ProfileRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def get(self, profile_id: int) -> Optional[ProfileRecord]:
+        with self._lock:
+            return next((r for r in self._records if r.id == profile_id), None)
+
+    def list(self) -> list[ProfileRecord]:
+        with self._lock:
+            return list(reversed(self._records))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+profile_buffer = ProfileBuffer(PROFILE_BUFFER_SIZE)
+
+# cProfile sees the whole process (sys.monitoring on Python 3.12+, which also
+# covers the threadpool worker running a sync handler), so only one request is
+# profiled at a time; others run normally and show up in a cprofile-mode
+# profile when they overlap it (its summary says "scope": "process")
+_profiling_lock = threading.Lock()
+_active: ContextVar[Optional[ProfileRecord]] = ContextVar("active_profile", default=None)
+
+
+# SQL capture for the profiled request (cheap no-op for every other request)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record = _active.get()
+    starts = conn.info.get("profile_query_start")
+    if record is None or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if len(record.queries) < MAX_PROFILE_QUERIES:
+        record.queries.append({"sql": statement, "seconds": round(elapsed, 6), "executemany": executemany})
+    else:
+        record.dropped_queries += 1
+
+
+def install_sql_capture() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class StackSampler:
+    """
+    Background thread recording, at a fixed interval, the stacks of the
+    threads serving the profiled request: the event loop thread that
+    started it, and the threadpool worker running its (sync) endpoint,
+    recognized by the endpoint's code on its stack. Other workers,
+    background threads and the sampler itself are left out. One sample is
+    taken when sampling starts and one when it stops, so even a request
+    shorter than the interval has some.
+    """
+
+    def __init__(self, interval: float, scope: dict):
+        self.interval = interval
+        self.scope = scope                               # routing adds "endpoint" to it
+        self.samples: dict[int, dict[tuple, int]] = {}   # thread id -> {stack: count}
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self.sample()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        endpoint = getattr(self.scope.get("endpoint"), "__code__", None)
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._thread.ident:
+                continue
+            stack, codes = [], set()
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_qualname, code.co_filename, code.co_firstlineno))
+                codes.add(code)
+                frame = frame.f_back
+            if thread_id != self._loop_thread and endpoint not in codes:
+                continue
+            counts = self.samples.setdefault(thread_id, {})
+            key = tuple(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+
+    def speedscope(self, name: str, duration: float) -> dict:
+        # speedscope "sampled" profiles, one per thread (https://www.speedscope.app)
+        frames: list[dict] = []
+        index: dict[tuple, int] = {}
+        names = {t.ident: t.name for t in threading.enumerate()}
+        profiles = []
+        for thread_id, counts in self.samples.items():
+            samples, weights = [], []
+            for stack, count in counts.items():
+                ids = []
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    ids.append(index[frame])
+                samples.append(ids)
+                weights.append(count * self.interval)
+            profiles.append({
+                "type": "sampled",
+                "name": names.get(thread_id, f"thread {thread_id}"),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "app.profiling",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+def _load_admin(sub: str) -> bool:
+    user = cached_user(sub)
+    if user is None:
+        with Session(engine) as session:
+            user = session.exec(select(User).where(User.email == sub)).first()
+        if user is None:
+            return False
+        remember_user(user)
+    return is_admin_user(user)
+
+
+async def is_admin_request(headers: dict) -> bool:
+    # Only admins may ask for a profile; invalid tokens just mean "no profile"
+    sub = bearer_subject(headers)
+    if sub is None:
+        return False
+    return await run_in_threadpool(_load_admin, sub)
+
+
+def requested_mode(scope, headers: dict) -> Optional[str]:
+    # "1"/"true" pick the default mode; "cprofile" or "sample" pick one explicitly
+    value = headers.get(PROFILE_HEADER)
+    if value is None:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        value = query.get("profile", [None])[0]
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in PROFILE_MODES:
+        return value
+    if value in ("1", "true", "yes", "on"):
+        return PROFILE_DEFAULT_MODE
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware: requests that are not profiled pay one header
+    lookup. cprofile mode profiles the whole process while the request
+    runs, so concurrent requests are mixed into its stats (use sample mode
+    on a busy server); sample mode records only the request's threads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        mode = requested_mode(scope, headers)
+        trigger = "admin"
+        if mode is not None and not await is_admin_request(headers):
+            mode = None
+        if mode is None and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            mode, trigger = PROFILE_DEFAULT_MODE, "sampled"
+        if mode is None or not _profiling_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send, mode, trigger)
+        finally:
+            _profiling_lock.release()
+
+    async def _profile(self, scope, receive, send, mode: str, trigger: str):
+        record = ProfileRecord(
+            id=profile_buffer.next_id(),
+            method=scope["method"],
+            path=scope["path"],
+            mode=mode,
+            trigger=trigger,
+            started_at=time.time(),
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record.status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.lower().encode(), str(record.id).encode()),
+                ]
+            await send(message)
+
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        sampler = StackSampler(PROFILE_SAMPLE_INTERVAL, scope) if mode == "sample" else None
+        token = _active.set(record)
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        else:
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                profiler.disable()
+            else:
+                sampler.stop()
+            record.duration = time.perf_counter() - start
+            _active.reset(token)
+            record.route = route_label(scope)
+            if profiler:
+                profiler.create_stats()
+                record.stats = profiler.stats
+            else:
+                record.speedscope = sampler.speedscope(f"{record.method} {record.path}", record.duration)
+            if record.stats or (record.speedscope and record.speedscope["profiles"]):
+                profile_buffer.add(record)  # nothing recorded: don't keep an empty profile
+
+
+def pstats_bytes(record: ProfileRecord) -> bytes:
+    # Same format as cProfile's output file: load with pstats.Stats(path) or snakeviz
+    return marshal.dumps(record.stats)
+
+
+def pstats_text(record: ProfileRecord, limit: int = 50) -> str:
+    # Top functions by cumulative time
+    stream = io.StringIO()
+    stats = pstats.Stats(stream=stream)
+    stats.stats = record.stats
+    stats.get_top_level_stats()
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
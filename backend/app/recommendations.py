@@ -0,0 +1,162 @@
+import heapq
+import json
+import os
+from collections import Counter, defaultdict
+from itertools import permutations
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from app.analytics import add_rows_to_rollup
+from app.cache import listing_cache
+from app.models.order_item import OrderItem
+from app.models.recommendations import ProductPair, RecommendationState, RelatedProducts
+from app.outbox import ORDER_PLACED, handler
+
+# "Frequently bought together": pair counts per product (ProductPair) and the
+# top RELATED_TOP_K related products of each one (RelatedProducts)
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "10"))                  # related products kept per product
+RELATED_MAX_ORDER_ITEMS = int(os.getenv("RELATED_MAX_ORDER_ITEMS", "50"))  # larger orders add no pairs
+REBUILD_BATCH_SIZE = 5000
+
+
+def order_pairs(product_ids: Iterable[int]) -> list[tuple[int, int]]:
+    # Ordered pairs of the distinct products of one order (n * (n - 1) pairs)
+    distinct = sorted(set(product_ids))
+    if len(distinct) > RELATED_MAX_ORDER_ITEMS:
+        return []  # bulk/wholesale orders say little about what goes together
+    return list(permutations(distinct, 2))
+
+
+def related_cache_key(product_id: int, limit: int) -> tuple:
+    return ("related", product_id, limit)
+
+
+def invalidate_related(product_ids: Iterable[int]) -> None:
+    # Evict the cached related-products pages (every limit) of these products
+    listing_cache.evict(
+        related_cache_key(product_id, limit) for product_id in product_ids for limit in range(1, RELATED_TOP_K + 1)
+    )
+
+
+def _top_related(session: Session, product_id: int) -> list[int]:
+    # Highest counts first, ties by product id (index ix_productpair_product_orders)
+    return list(session.exec(
+        select(ProductPair.related_id)
+        .where(ProductPair.product_id == product_id)
+        .order_by(ProductPair.orders.desc(), ProductPair.related_id)
+        .limit(RELATED_TOP_K)
+    ).all())
+
+
+@handler(ORDER_PLACED)
+def record_pairs(payload: dict, session: Session) -> None:
+    """
+    Count the product pairs of one placed order and refresh the top-k list
+    of every product in it. Runs in the outbox worker's transaction (see
+    app.analytics.record_order); orders covered by a rebuild are skipped.
+    """
+    state = session.get(RecommendationState, 1)
+    if state is not None and state.built_through is not None and payload["order_id"] <= state.built_through:
+        return
+
+    product_ids = session.exec(select(OrderItem.product_id).where(OrderItem.order_id == payload["order_id"])).all()
+    pairs = order_pairs(product_ids)
+    if not pairs:
+        return
+    add_rows_to_rollup(
+        session,
+        ProductPair,
+        ["product_id", "related_id"],
+        [{"product_id": p, "related_id": r, "orders": 1} for p, r in pairs],
+    )
+
+    products = sorted({p for p, _ in pairs})
+    existing = {
+        row.product_id: row
+        for row in session.exec(select(RelatedProducts).where(RelatedProducts.product_id.in_(products))).all()
+    }
+    changed = session.info.setdefault("related_changed", set())
+    for product_id in products:
+        related = json.dumps(_top_related(session, product_id))
+        row = existing.get(product_id)
+        if row is None:
+            session.add(RelatedProducts(product_id=product_id, related=related))
+        elif row.related != related:
+            row.related = related
+            session.add(row)
+        else:
+            continue
+        changed.add(product_id)
+
+
+# Cached related pages are evicted once the new lists are committed (evicting
+# when the order is placed would let a request re-cache the old list before
+# the worker gets to the event)
+@event.listens_for(OrmSession, "after_commit")
+def _evict_related(session) -> None:
+    changed = session.info.pop("related_changed", None)
+    if changed:
+        invalidate_related(changed)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_related(session) -> None:
+    session.info.pop("related_changed", None)
+
+
+def rebuild(engine: Engine) -> dict:
+    """
+    Recount every pair from the order history and recompute all top-k
+    lists in one transaction. Items are streamed in order id order, so
+    only the pair counts are held in memory.
+    """
+    with Session(engine) as session:
+        items = session.exec(
+            select(OrderItem.order_id, OrderItem.product_id).order_by(OrderItem.order_id)
+        )
+        counts: Counter = Counter()
+        last_id, current, order_products = 0, None, []
+        for order_id, product_id in items:
+            if order_id != current:
+                counts.update(order_pairs(order_products))
+                current, order_products = order_id, []
+            order_products.append(product_id)
+            last_id = order_id
+        counts.update(order_pairs(order_products))
+
+        by_product: dict[int, list[tuple[int, int]]] = defaultdict(list)
+        for (product_id, related_id), n in counts.items():
+            by_product[product_id].append((n, related_id))
+
+        session.execute(delete(ProductPair))
+        session.execute(delete(RelatedProducts))
+        pair_rows = [{"product_id": p, "related_id": r, "orders": n} for (p, r), n in counts.items()]
+        for start in range(0, len(pair_rows), REBUILD_BATCH_SIZE):
+            session.execute(insert(ProductPair.__table__), pair_rows[start:start + REBUILD_BATCH_SIZE])
+        related_rows = [
+            {
+                "product_id": product_id,
+                "related": json.dumps(
+                    [r for _, r in heapq.nsmallest(RELATED_TOP_K, candidates, key=lambda c: (-c[0], c[1]))]
+                ),
+            }
+            for product_id, candidates in by_product.items()
+        ]
+        for start in range(0, len(related_rows), REBUILD_BATCH_SIZE):
+            session.execute(insert(RelatedProducts.__table__), related_rows[start:start + REBUILD_BATCH_SIZE])
+
+        state = session.get(RecommendationState, 1) or RecommendationState(id=1)
+        state.built_through = last_id
+        session.add(state)
+        session.commit()
+
+    return {"orders_through_id": last_id, "pairs": len(pair_rows), "products": len(related_rows)}
+
+
+def related_ids(row: Optional[RelatedProducts]) -> list[int]:
+    # Top related product ids of a RelatedProducts row (none yet when row is None)
+    return json.loads(row.related) if row is not None else []
@@ -0,0 +1,36 @@
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import Response
+
+# Fast JSON rendering for read endpoints: orjson when it is installed (optional
+# dependency), otherwise the stdlib encoder with the same compact output
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(value: Any):
+    # Types the stdlib encoder does not know (orjson handles them natively)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data: Any) -> bytes:
+    # Compact UTF-8 JSON, like FastAPI's default JSONResponse
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def rows_to_json(rows: Iterable) -> bytes:
+    # Column rows (select(*columns)) straight to a JSON array: no ORM objects, no re-validation
+    return dumps([row._asdict() for row in rows])
+
+
+def json_response(data: Any, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    # Pre-rendered JSON response (skips jsonable_encoder and response_model validation)
+    return Response(content=dumps(data), status_code=status_code, media_type="application/json", headers=headers)
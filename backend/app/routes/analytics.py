@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.analytics import TopProductsSort, product_sales_page, revenue_by_day, top_products
+from app.auth import require_admin
+from app.dependencies import SessionDep
+from app.models.user import User
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+# Admin sales reports, served from the rollup tables (app.analytics)
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 366
+
+
+def report_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    # Inclusive UTC day range; defaults to the last DEFAULT_REPORT_DAYS days
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_REPORT_DAYS} days")
+    return start, end
+
+
+@router.get("/revenue")
+def revenue(
+    session: SessionDep,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    admin: User = Depends(require_admin),
+):
+    # Orders, revenue and units per day and currency (days without sales are omitted)
+    start, end = report_range(start, end)
+    return revenue_by_day(session, start, end, currency)
+
+
+@router.get("/top-products")
+def best_sellers(
+    session: SessionDep,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    sort: TopProductsSort = "revenue",
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+    admin: User = Depends(require_admin),
+):
+    # Best-selling products between start and end, by revenue or by units (one row per product and currency)
+    start, end = report_range(start, end)
+    return top_products(session, start, end, limit, sort, currency)
+
+
+@router.get("/products")
+def units_per_product(
+    response: Response,
+    session: SessionDep,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    admin: User = Depends(require_admin),
+):
+    # All-time units, revenue and orders per product; next page cursor in X-Next-Cursor
+    after_id = decode_cursor(cursor, (int,))[0] if cursor else None
+    rows = product_sales_page(session, limit, after_id)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].product_id])
+    return [row.model_dump() for row in rows]
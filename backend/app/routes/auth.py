@@ -1,16 +1,24 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, field_validator
 from sqlmodel import Session, select, delete
 
 from app.db import get_session
 from app.models.user import User
 from app.auth import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
+    needs_rehash,
     create_access_token,
     get_current_user,
     is_admin_email,
+    require_admin,
+    auth_cache_stats,
+    invalidate_user,
 )
+from app.hashing import PasswordHasherBusy, hash_pool
 
 # Router for authentication and user management
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -36,18 +44,39 @@ class LoginIn(BaseModel):
     password: str
 
 
+def hasher_busy() -> HTTPException:
+    # The password worker pool is saturated: ask the client to retry shortly
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-ins in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+def find_user(session: Session, email: str) -> Optional[User]:
+    return session.exec(select(User).where(User.email == email)).first()
+
+
+def save_user(session: Session, user: User) -> User:
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+# Register and login are async so that while bcrypt runs on the password pool
+# they don't hold a request thread; DB work is sent to the threadpool.
 @router.post("/register", status_code=201)
-def register(payload: RegisterIn, session: Session = Depends(get_session)):
+async def register(payload: RegisterIn, session: Session = Depends(get_session)):
     email = payload.email.strip().lower()
 
-    exists = session.exec(select(User).where(User.email == email)).first()
+    exists = await run_in_threadpool(find_user, session, email)
     if exists:
         # (optional) if user already exists and matches ADMIN_EMAIL, promote to admin
         if is_admin_email(email) and not exists.is_admin:
             exists.is_admin = True
-            session.add(exists)
-            session.commit()
-            session.refresh(exists)
+            await run_in_threadpool(save_user, session, exists)
+            invalidate_user(email)
             return {"id": exists.id, "email": exists.email, "is_admin": exists.is_admin}
 
         raise HTTPException(status_code=409, detail="Email already registered")
@@ -56,32 +85,56 @@ def register(payload: RegisterIn, session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail="Password too short (min 6 characters)")
 
     try:
-        hashed = hash_password(payload.password)
+        hashed = await hash_password_async(payload.password)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    except PasswordHasherBusy:
+        raise hasher_busy()
 
     # Key detail: if email matches ADMIN_EMAIL, user is created as admin
     user = User(email=email, hashed_password=hashed, is_admin=is_admin_email(email))
-
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    await run_in_threadpool(save_user, session, user)
 
     return {"id": user.id, "email": user.email, "is_admin": user.is_admin}
 
 
 @router.post("/login")
-def login(payload: LoginIn, session: Session = Depends(get_session)):
+async def login(payload: LoginIn, session: Session = Depends(get_session)):
     email = payload.email.strip().lower()
 
-    user = session.exec(select(User).where(User.email == email)).first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    user = await run_in_threadpool(find_user, session, email)
+    try:
+        valid = user is not None and await verify_password_async(payload.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise hasher_busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Upgrade the stored hash when BCRYPT_ROUNDS changed (best effort: skipped when busy)
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await hash_password_async(payload.password)
+            await run_in_threadpool(save_user, session, user)
+            invalidate_user(email)
+        except PasswordHasherBusy:
+            pass
+
     token = create_access_token(sub=user.email)
     return {"access_token": token, "token_type": "bearer", "is_admin": user.is_admin}
 
 
+@router.get("/hash/stats")
+def password_hash_stats(admin: User = Depends(require_admin)):
+    # Queue depth and latency of the password worker pool (admin only)
+    return hash_pool.stats()
+
+
+@router.get("/cache/stats")
+def authentication_cache_stats(admin: User = Depends(require_admin)):
+    # Hit/miss counters of the token and user caches (admin only)
+    return auth_cache_stats()
+
+
 @router.get("/me")
 def me(user: User = Depends(get_current_user)):
     # Return current authenticated user
@@ -96,4 +149,5 @@ def delete_me(
     # Delete the currently authenticated user
     session.exec(delete(User).where(User.id == user.id))
     session.commit()
+    invalidate_user(user.email)
     return
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
+
+from app.dependencies import AsyncSessionDep
+from app.models.user import User
+from app.auth import (
+    create_access_token,
+    get_current_user_async,
+    hash_password_async,
+    invalidate_user,
+    needs_rehash,
+    verify_password_async,
+)
+from app.hashing import PasswordHasherBusy
+from app.routes.auth import LoginIn, hasher_busy
+
+# Async versions of the hot authentication endpoints (DB_ASYNC mode)
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+@router.post("/login")
+async def login(payload: LoginIn, session: AsyncSessionDep):
+    email = payload.email.strip().lower()
+
+    user = (await session.exec(select(User).where(User.email == email))).first()
+    try:
+        valid = user is not None and await verify_password_async(payload.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise hasher_busy()
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Upgrade the stored hash when BCRYPT_ROUNDS changed (best effort: skipped when busy)
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await hash_password_async(payload.password)
+            session.add(user)
+            await session.commit()
+            invalidate_user(email)
+        except PasswordHasherBusy:
+            pass
+
+    token = create_access_token(sub=user.email)
+    return {"access_token": token, "token_type": "bearer", "is_admin": user.is_admin}
+
+
+@router.get("/me")
+async def me(user: User = Depends(get_current_user_async)):
+    # Return current authenticated user
+    return {"id": user.id, "email": user.email, "is_admin": user.is_admin}
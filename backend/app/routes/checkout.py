@@ -1,11 +1,24 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import IntegrityError
+from app.db import mark_recent_write
 from app.dependencies import SessionDep
-from app.models.product import Product
+from app.stock import load_stock, merge_lines
+from app.cache import invalidate_products
+from app.ordering import place_order
+from app.idempotency import check_key, expired_key_statement, remember, replay, request_fingerprint, stored_key_query
+from app.routes.orders import require_user_email
+from app.holds import HOLD_MINUTES, MAX_HOLD_MINUTES, get_sweeper, place_hold, release_holds
+from app.auth import bearer_subject, require_admin
+from app.models.user import User
 
 # Router for checkout-related endpoints
 router = APIRouter(prefix="/checkout", tags=["checkout"])
 
+MAX_BULK_CARTS = 1000
+
 
 class Item(BaseModel):
     # Single cart item
@@ -14,30 +27,178 @@ class Item(BaseModel):
 
 
 class Cart(BaseModel):
-    # Shopping cart payload
+    # Shopping cart payload (hold_id: stock held with POST /checkout/hold, used by checkout)
     items: list[Item]
+    hold_id: Optional[str] = None
 
 
-@router.post("/validate")
-def validate_cart(cart: Cart, session: SessionDep):
-    # Validate cart items against current product stock
-    errors = []
+class BulkCarts(BaseModel):
+    # Many carts validated in one request (abandoned-cart reprocessing)
+    carts: list[Cart] = Field(max_length=MAX_BULK_CARTS)
+
 
-    for item in cart.items:
-        product = session.get(Product, item.product_id)
+def cart_product_ids(carts: list[Cart]) -> list[int]:
+    return list({item.product_id for cart in carts for item in cart.items})
 
-        if not product:
-            errors.append({"product_id": item.product_id, "reason": "NOT_FOUND"})
-        elif item.quantity > product.stock:
+
+def validate_items(items: list[Item], stock_map: dict[int, int]) -> list[dict]:
+    # Check every line of a cart (repeated products are merged) and return all errors
+    errors = [
+        {"product_id": item.product_id, "reason": "INVALID_QUANTITY", "requested": item.quantity}
+        for item in items
+        if item.quantity < 1
+    ]
+
+    lines = merge_lines([item.model_dump() for item in items if item.quantity >= 1])
+    for pid, qty in lines.items():
+        stock = stock_map.get(pid)
+        if stock is None:
+            errors.append({"product_id": pid, "reason": "NOT_FOUND"})
+        elif qty > stock:
             errors.append({
-                "product_id": item.product_id,
+                "product_id": pid,
                 "reason": "OUT_OF_STOCK",
-                "stock": product.stock,
-                "requested": item.quantity,
+                "stock": stock,
+                "requested": qty,
             })
 
+    return errors
+
+
+def cart_result(errors: list[dict]) -> dict:
+    return {"ok": not errors, "errors": errors}
+
+
+@router.post("/validate")
+def validate_cart(cart: Cart, session: SessionDep):
+    # Validate cart items against current product stock (one query for the whole cart)
+    stock_map = load_stock(session, cart_product_ids([cart]))
+    errors = validate_items(cart.items, stock_map)
+
     if errors:
         # Return all validation errors at once
         raise HTTPException(status_code=400, detail={"errors": errors})
 
     return {"ok": True}
+
+
+@router.post("/validate/bulk")
+def validate_carts(payload: BulkCarts, session: SessionDep):
+    # Validate many carts with a single stock lookup; one result per cart, in order
+    stock_map = load_stock(session, cart_product_ids(payload.carts))
+    return {"results": [cart_result(validate_items(cart.items, stock_map)) for cart in payload.carts]}
+
+
+def order_response(order) -> dict:
+    return {
+        "id": order.id,
+        "status": order.status,
+        "total_cents": order.total_cents,
+        "currency": order.currency,
+    }
+
+
+@router.post("/", status_code=201)
+def checkout(
+    cart: Cart,
+    request: Request,
+    session: SessionDep,
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+    idempotency_key: Optional[str] = Header(default=None, convert_underscores=False, alias="Idempotency-Key"),
+):
+    """
+    Validate the cart and place the order in one transaction (replaces the
+    /checkout/validate + POST /orders/ round trips). With an Idempotency-Key
+    header, a retry of a successful checkout replays the stored response
+    without doing any other database work.
+    """
+    user_email = require_user_email(x_user_email)
+    key = check_key(idempotency_key)
+
+    items = [item.model_dump() for item in cart.items]
+    request_hash = request_fingerprint(merge_lines(items))
+
+    if key:
+        stored = session.exec(stored_key_query(user_email, key)).first()
+        if stored:
+            return replay(stored, request_hash)
+        session.execute(expired_key_statement(user_email, key))
+
+    order, touched = place_order(session, user_email, items, cart.hold_id)
+    body = order_response(order)
+    if key:
+        session.add(remember(user_email, key, request_hash, 201, body))
+
+    try:
+        session.commit()
+    except IntegrityError:
+        # A concurrent request with the same key committed first: drop this order, replay that one
+        session.rollback()
+        stored = session.exec(stored_key_query(user_email, key)).first() if key else None
+        if not stored:
+            raise
+        return replay(stored, request_hash)
+
+    invalidate_products(touched, columns=["stock"])
+    mark_recent_write(bearer_subject(request.headers))
+    return body
+
+
+@router.post("/hold", status_code=201)
+def hold_stock(
+    cart: Cart,
+    request: Request,
+    session: SessionDep,
+    minutes: int = Query(HOLD_MINUTES, ge=1, le=MAX_HOLD_MINUTES),
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+):
+    """
+    Set the cart's stock aside for `minutes`, so placing the order (with
+    the returned hold_id) can't fail for lack of stock. A user has one hold
+    at a time: holding again gives the previous hold back first. Sold-out
+    lines return 409, with Retry-After when other holds may release stock.
+    """
+    user_email = require_user_email(x_user_email)
+    if not cart.items:
+        raise HTTPException(status_code=400, detail="Empty cart")
+    if any(item.quantity < 1 for item in cart.items):
+        raise HTTPException(status_code=400, detail="Invalid quantity")
+    lines = merge_lines([item.model_dump() for item in cart.items])
+
+    released = release_holds(session, user_email)
+    hold_id, expires_at = place_hold(session, user_email, lines, minutes)
+    session.commit()
+
+    invalidate_products(set(lines) | set(released), columns=["stock"])
+    mark_recent_write(bearer_subject(request.headers))
+    return {
+        "hold_id": hold_id,
+        "expires_at": expires_at.isoformat(),
+        "items": [{"product_id": pid, "quantity": qty} for pid, qty in lines.items()],
+    }
+
+
+@router.delete("/hold/{hold_id}", status_code=204)
+def release_hold(
+    hold_id: str,
+    request: Request,
+    session: SessionDep,
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+):
+    # Give a hold back to stock before it expires (e.g. the cart was emptied)
+    user_email = require_user_email(x_user_email)
+    released = release_holds(session, user_email, hold_id)
+    session.commit()
+    if not released:
+        raise HTTPException(status_code=404)
+    invalidate_products(released, columns=["stock"])
+    mark_recent_write(bearer_subject(request.headers))
+
+
+@router.get("/holds/stats")
+def hold_stats(admin: User = Depends(require_admin)):
+    # Active holds, held units and sweeper counters (admin only)
+    sweeper = get_sweeper()
+    if sweeper is None:
+        raise HTTPException(status_code=503, detail="Hold sweeper is not running")
+    return sweeper.stats()
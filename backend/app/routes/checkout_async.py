@@ -0,0 +1,84 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Header, Request
+from sqlalchemy.exc import IntegrityError
+
+from app.auth import bearer_subject
+from app.db import mark_recent_write
+from app.dependencies import AsyncSessionDep
+from app.cache import invalidate_products
+from app.ordering import place_order_async
+from app.stock import load_stock_async, merge_lines
+from app.idempotency import check_key, expired_key_statement, remember, replay, request_fingerprint, stored_key_query
+from app.routes.orders import require_user_email
+from app.routes.checkout import (
+    BulkCarts,
+    Cart,
+    cart_product_ids,
+    cart_result,
+    order_response,
+    validate_items,
+)
+
+# Async versions of the cart validation endpoints (DB_ASYNC mode)
+router = APIRouter(prefix="/checkout", tags=["checkout"])
+
+
+@router.post("/validate")
+async def validate_cart(cart: Cart, session: AsyncSessionDep):
+    # Validate cart items against current product stock (one query for the whole cart)
+    stock_map = await load_stock_async(session, cart_product_ids([cart]))
+    errors = validate_items(cart.items, stock_map)
+
+    if errors:
+        # Return all validation errors at once
+        raise HTTPException(status_code=400, detail={"errors": errors})
+
+    return {"ok": True}
+
+
+@router.post("/validate/bulk")
+async def validate_carts(payload: BulkCarts, session: AsyncSessionDep):
+    # Validate many carts with a single stock lookup; one result per cart, in order
+    stock_map = await load_stock_async(session, cart_product_ids(payload.carts))
+    return {"results": [cart_result(validate_items(cart.items, stock_map)) for cart in payload.carts]}
+
+
+@router.post("/", status_code=201)
+async def checkout(
+    cart: Cart,
+    request: Request,
+    session: AsyncSessionDep,
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+    idempotency_key: Optional[str] = Header(default=None, convert_underscores=False, alias="Idempotency-Key"),
+):
+    # Validate and place the order in one transaction, honoring Idempotency-Key
+    user_email = require_user_email(x_user_email)
+    key = check_key(idempotency_key)
+
+    items = [item.model_dump() for item in cart.items]
+    request_hash = request_fingerprint(merge_lines(items))
+
+    if key:
+        stored = (await session.exec(stored_key_query(user_email, key))).first()
+        if stored:
+            return replay(stored, request_hash)
+        await session.execute(expired_key_statement(user_email, key))
+
+    order, touched = await place_order_async(session, user_email, items, cart.hold_id)
+    body = order_response(order)
+    if key:
+        session.add(remember(user_email, key, request_hash, 201, body))
+
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        stored = (await session.exec(stored_key_query(user_email, key))).first() if key else None
+        if not stored:
+            raise
+        return replay(stored, request_hash)
+
+    invalidate_products(touched, columns=["stock"])
+    mark_recent_write(bearer_subject(request.headers))
+    return body
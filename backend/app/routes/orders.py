@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 
-from app.db import get_session
+from app.db import get_read_session, get_session, mark_recent_write
+from app.auth import bearer_subject, require_admin
+from app.models.user import User
+from app.outbox import get_worker
+from app.group_commit import get_order_writer
 from app.models.product import Product
 from app.models.order import Order
 from app.models.order_item import OrderItem
+from app.cache import invalidate_products
+from app.ordering import place_order
+from app.pagination import decode_cursor, encode_cursor, next_cursor_headers
+from app.responses import dumps, json_response
 
 # Router for order-related endpoints
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Order history page sizes, and how many orders an export loads per query
+DEFAULT_ORDERS_PAGE_SIZE = 20
+MAX_ORDERS_PAGE_SIZE = 100
+EXPORT_BATCH_SIZE = 500
+
 
 def require_user_email(x_user_email: Optional[str]) -> str:
     # Validate presence of X-User-Email header
@@ -19,127 +35,188 @@ def require_user_email(x_user_email: Optional[str]) -> str:
     return x_user_email.strip()
 
 
+def orders_page_query(user_email: str, limit: int, cursor: Optional[str] = None):
+    # Newest orders first, keyset-paginated on (created_at, id); fetches one extra row
+    query = select(Order).where(Order.user_email == user_email)
+    if cursor:
+        created_at, order_id = decode_cursor(cursor, (str, int))
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(Order.created_at, Order.id) < (created_at, order_id))
+    return query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+
+
+def next_orders_cursor(orders: list[Order], limit: int) -> Optional[str]:
+    if len(orders) <= limit:
+        return None
+    last = orders[limit - 1]
+    return encode_cursor([last.created_at.isoformat(), last.id])
+
+
+def order_items_query(order_ids: list[int]):
+    # Items of the given orders with the product title joined in SQL
+    return (
+        select(
+            OrderItem.order_id,
+            OrderItem.product_id,
+            OrderItem.quantity,
+            OrderItem.unit_price_cents,
+            Product.title,
+        )
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+
+
+def serialize_orders(orders: list[Order], item_rows: list) -> list[dict]:
+    # Exact response format expected by MyOrder.tsx
+    items_by_order = {}
+    for order_id, product_id, quantity, unit_price_cents, title in item_rows:
+        items_by_order.setdefault(order_id, []).append(
+            {
+                "product_id": product_id,
+                "quantity": quantity,
+                "unit_price_cents": unit_price_cents,
+                "title": title,
+            }
+        )
+
+    return [
+        {
+            "id": o.id,
+            "user_email": o.user_email,
+            "status": o.status,
+            "total_cents": o.total_cents,
+            "currency": o.currency,
+            "created_at": o.created_at.isoformat(),
+            "items": items_by_order.get(o.id, []),
+        }
+        for o in orders
+    ]
+
+
+def load_orders_page(session: Session, user_email: str, limit: int, cursor: Optional[str]):
+    # One page of serialized orders plus the cursor of the next page (two queries)
+    orders = session.exec(orders_page_query(user_email, limit, cursor)).all()
+    next_cursor = next_orders_cursor(orders, limit)
+    orders = orders[:limit]
+    if not orders:
+        return [], None
+
+    item_rows = session.exec(order_items_query([o.id for o in orders])).all()
+    return serialize_orders(orders, item_rows), next_cursor
+
+
+async def load_orders_page_async(session: AsyncSession, user_email: str, limit: int, cursor: Optional[str]):
+    # Async twin of load_orders_page
+    orders = (await session.exec(orders_page_query(user_email, limit, cursor))).all()
+    next_cursor = next_orders_cursor(orders, limit)
+    orders = orders[:limit]
+    if not orders:
+        return [], None
+
+    item_rows = (await session.exec(order_items_query([o.id for o in orders]))).all()
+    return serialize_orders(orders, item_rows), next_cursor
+
+
 @router.post("/", status_code=201)
 def create_order(
     payload: dict,
+    request: Request,
     session: Session = Depends(get_session),
     x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
 ):
     """
     Create an order for the user identified by the X-User-Email header.
     Example payload: { "items": [ {"product_id": 1, "quantity": 2}, ... ] }
+    An optional "hold_id" (from POST /checkout/hold) uses the stock held for the cart.
     """
     user_email = require_user_email(x_user_email)
 
-    items = payload.get("items", [])
-    if not items:
-        raise HTTPException(status_code=400, detail="Empty cart")
-
-    product_ids = [int(i["product_id"]) for i in items]
-    products = session.exec(select(Product).where(Product.id.in_(product_ids))).all()
-    products_map = {p.id: p for p in products}
-
-    total_cents = 0
-    currency = None
-
-    for it in items:
-        pid = int(it["product_id"])
-        qty = int(it["quantity"])
-
-        p = products_map.get(pid)
-        if not p:
-            raise HTTPException(status_code=404, detail=f"Product {pid} does not exist")
-        if qty < 1:
-            raise HTTPException(status_code=400, detail="Invalid quantity")
-        if p.stock < qty:
-            raise HTTPException(status_code=409, detail=f"Not enough stock for {p.title}")
-
-        currency = currency or p.currency
-        if p.currency != currency:
-            raise HTTPException(status_code=400, detail="Mixed currencies are not supported")
-
-        total_cents += p.price_cents * qty
-
-    order = Order(
-        user_email=user_email,
-        status="paid",  # or "pending" if Stripe is added later
-        total_cents=total_cents,
-        currency=currency or "EUR",
-        created_at=datetime.utcnow(),
-    )
-    session.add(order)
-    session.flush()  # needed to get order.id
-
-    for it in items:
-        pid = int(it["product_id"])
-        qty = int(it["quantity"])
-        p = products_map[pid]
-
-        oi = OrderItem(
-            order_id=order.id,
-            product_id=p.id,
-            unit_price_cents=p.price_cents,
-            quantity=qty,
-        )
-        session.add(oi)
-
-        # Reduce product stock
-        p.stock -= qty
-        session.add(p)
-
+    order, touched = place_order(session, user_email, payload.get("items", []), payload.get("hold_id"))
     session.commit()
-    session.refresh(order)
+
+    # Stock changed for every product in the order
+    invalidate_products(touched, columns=["stock"])
+    mark_recent_write(bearer_subject(request.headers))
     return {"id": order.id}
 
 
 @router.get("/my")
 def my_orders(
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+    limit: int = Query(DEFAULT_ORDERS_PAGE_SIZE, ge=1, le=MAX_ORDERS_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """
-    Return all orders for the current user (from X-User-Email header),
-    including items, ordered from newest to oldest.
+    Return one page of orders for the current user (from X-User-Email header),
+    including items, ordered from newest to oldest. The cursor of the next
+    page is sent in the X-Next-Cursor header.
     """
     user_email = require_user_email(x_user_email)
 
-    orders = session.exec(
-        select(Order).where(Order.user_email == user_email).order_by(Order.created_at.desc())
-    ).all()
-
-    if not orders:
-        return []
-
-    order_ids = [o.id for o in orders]
-    items = session.exec(select(OrderItem).where(OrderItem.order_id.in_(order_ids))).all()
+    orders, next_cursor = load_orders_page(session, user_email, limit, cursor)
+    # Already plain JSON types: render directly instead of going through jsonable_encoder
+    return json_response(orders, next_cursor_headers(next_cursor))
 
-    # Load all related products in a single query
-    product_ids = list({it.product_id for it in items})
-    products = session.exec(select(Product).where(Product.id.in_(product_ids))).all()
-    products_map = {p.id: p for p in products}
 
-    items_by_order = {}
-    for it in items:
-        p = products_map.get(it.product_id)
-        items_by_order.setdefault(it.order_id, []).append(
-            {
-                "product_id": it.product_id,
-                "quantity": it.quantity,
-                "unit_price_cents": it.unit_price_cents,
-                "title": p.title if p else None,
-            }
-        )
+@router.get("/my/export")
+def export_my_orders(
+    session: Session = Depends(get_read_session),
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+    format: Literal["ndjson", "json"] = "ndjson",
+):
+    """
+    Stream the full order history of the current user, newest first, as
+    NDJSON (one order per line) or as a JSON array. Orders are loaded in
+    batches, so memory stays flat however long the history is.
+    """
+    user_email = require_user_email(x_user_email)
 
-    # Exact response format expected by MyOrder.tsx
-    return [
-        {
-            "id": o.id,
-            "user_email": o.user_email,
-            "status": o.status,
-            "total_cents": o.total_cents,
-            "currency": o.currency,
-            "created_at": o.created_at.isoformat(),
-            "items": items_by_order.get(o.id, []),
-        }
-        for o in orders
-    ]
+    def batches():
+        cursor = None
+        while True:
+            orders, cursor = load_orders_page(session, user_email, EXPORT_BATCH_SIZE, cursor)
+            if orders:
+                yield orders
+            if not cursor:
+                return
+
+    def ndjson():
+        for orders in batches():
+            yield b"".join(dumps(o) + b"\n" for o in orders)
+
+    def json_array():
+        yield b"["
+        first = True
+        for orders in batches():
+            chunk = b",".join(dumps(o) for o in orders)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+
+    if format == "ndjson":
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    return StreamingResponse(json_array(), media_type="application/json")
+
+
+@router.get("/outbox/stats")
+def outbox_stats(admin: User = Depends(require_admin)):
+    # Queued/failed order events and worker counters (admin only)
+    worker = get_worker()
+    if worker is None:
+        raise HTTPException(status_code=503, detail="Outbox workers are not running")
+    return worker.stats()
+
+
+@router.get("/group-commit/stats")
+def group_commit_stats(admin: User = Depends(require_admin)):
+    # Batches and orders placed by the group-commit writer (admin only)
+    writer = get_order_writer()
+    if writer is None:
+        raise HTTPException(status_code=503, detail="Group commit is not enabled")
+    return writer.stats()
@@ -0,0 +1,52 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Request
+
+from app.auth import bearer_subject
+from app.db import mark_recent_write
+from app.dependencies import AsyncReadSessionDep, AsyncSessionDep
+from app.cache import invalidate_products
+from app.ordering import place_order_async
+from app.pagination import next_cursor_headers
+from app.responses import json_response
+from app.routes.orders import (
+    DEFAULT_ORDERS_PAGE_SIZE,
+    MAX_ORDERS_PAGE_SIZE,
+    load_orders_page_async,
+    require_user_email,
+)
+
+# Async versions of the order endpoints (DB_ASYNC mode)
+router = APIRouter(prefix="/orders", tags=["orders"])
+
+
+@router.post("/", status_code=201)
+async def create_order(
+    payload: dict,
+    request: Request,
+    session: AsyncSessionDep,
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+):
+    # Same flow as the sync create_order: validate, reserve stock, insert, commit
+    user_email = require_user_email(x_user_email)
+
+    order, touched = await place_order_async(session, user_email, payload.get("items", []), payload.get("hold_id"))
+    await session.commit()
+
+    invalidate_products(touched, columns=["stock"])
+    mark_recent_write(bearer_subject(request.headers))
+    return {"id": order.id}
+
+
+@router.get("/my")
+async def my_orders(
+    session: AsyncReadSessionDep,
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+    limit: int = Query(DEFAULT_ORDERS_PAGE_SIZE, ge=1, le=MAX_ORDERS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    # One page of the current user's orders, newest first (next cursor in X-Next-Cursor)
+    user_email = require_user_email(x_user_email)
+
+    orders, next_cursor = await load_orders_page_async(session, user_email, limit, cursor)
+    return json_response(orders, next_cursor_headers(next_cursor))
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Request
+
+from app.auth import bearer_subject
+from app.db import mark_recent_write
+from app.group_commit import submit_order
+from app.routes.orders import require_user_email
+
+# POST /orders/ through the group-commit writer (ORDER_GROUP_COMMIT mode).
+# Registered before the other order routers, so it takes over this path only.
+router = APIRouter(prefix="/orders", tags=["orders"])
+
+
+@router.post("/", status_code=201)
+async def create_order(
+    payload: dict,
+    request: Request,
+    x_user_email: Optional[str] = Header(default=None, convert_underscores=False, alias="X-User-Email"),
+):
+    # Same validation and errors as the sync create_order; the commit is shared with concurrent orders
+    user_email = require_user_email(x_user_email)
+    order = await submit_order(user_email, payload.get("items", []), payload.get("hold_id"))
+    mark_recent_write(bearer_subject(request.headers))
+    return {"id": order["id"]}
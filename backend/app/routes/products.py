@@ -1,19 +1,362 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import select
+from dataclasses import dataclass
+from typing import Literal, Optional
 
-from app.dependencies import SessionDep
+import anyio
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.db import cacheable_read, mark_recent_write
+from app.dependencies import ReadSessionDep, SessionDep
 from app.models.product import Product, ProductCreate
 from app.auth import require_admin
 from app.models.user import User
+from app.pagination import decode_cursor, encode_cursor, next_cursor_headers
+from app.search import search_products
+from app.catalog_io import CatalogFormat, export_products, import_products, iter_lines, iter_rows
+from app.inventory import apply_product_patches
+from app.responses import dumps, rows_to_json
+from app.models.recommendations import RelatedProducts
+from app.recommendations import RELATED_TOP_K, related_cache_key, related_ids
+from app.catalog_snapshot import current_snapshot, snapshot_stats
+from app.cache import (
+    CachedResponse,
+    cache_stats,
+    cached_json_response,
+    invalidate_products,
+    listing_cache,
+    product_cache,
+    render_cached,
+    slug_cache,
+)
 
 # Router for product-related endpoints
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Page size limits for the catalog listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Products per bulk stock/price PATCH request
+MAX_BULK_PATCHES = 10000
+
+ProductSort = Literal["id", "price_asc", "price_desc"]
+
+
+class ProductPatch(BaseModel):
+    # Partial update of one product: absolute stock or a stock delta, and/or a new price
+    id: int
+    stock: Optional[int] = None
+    stock_delta: Optional[int] = None
+    price_cents: Optional[int] = None
+
+
+class BulkProductPatch(BaseModel):
+    # Stock/price updates pushed by inventory sync jobs, applied all-or-nothing
+    products: list[ProductPatch] = Field(min_length=1, max_length=MAX_BULK_PATCHES)
+
+
+# Listings read plain column rows instead of Product instances (see rows_to_json)
+PRODUCT_COLUMNS = tuple(Product.__table__.columns)
+
+
+def build_listing_query(
+    limit: int,
+    cursor: Optional[str] = None,
+    sort: ProductSort = "id",
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    in_stock: Optional[bool] = None,
+    currency: Optional[str] = None,
+):
+    # Build the keyset-paginated catalog query (fetches one extra row to detect a next page)
+    query = select(*PRODUCT_COLUMNS)
+
+    if min_price is not None:
+        query = query.where(Product.price_cents >= min_price)
+    if max_price is not None:
+        query = query.where(Product.price_cents <= max_price)
+    if in_stock is True:
+        query = query.where(Product.stock > 0)
+    elif in_stock is False:
+        query = query.where(Product.stock <= 0)
+    if currency:
+        query = query.where(Product.currency == currency.upper())
+
+    if sort == "id":
+        if cursor:
+            (last_id,) = decode_cursor(cursor, (int,))
+            query = query.where(Product.id > last_id)
+        query = query.order_by(Product.id)
+    else:
+        key = tuple_(Product.price_cents, Product.id)
+        if cursor:
+            last = tuple(decode_cursor(cursor, (int, int)))
+            query = query.where(key > last if sort == "price_asc" else key < last)
+        if sort == "price_asc":
+            query = query.order_by(Product.price_cents, Product.id)
+        else:
+            query = query.order_by(Product.price_cents.desc(), Product.id.desc())
+
+    return query.limit(limit + 1)
+
+
+def next_page_cursor(rows: list, limit: int, sort: ProductSort) -> Optional[str]:
+    # Return the cursor of the following page, or None when this is the last one
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor([last.id] if sort == "id" else [last.price_cents, last.id])
+
+
+def render_json(data) -> bytes:
+    # Serialize like FastAPI's default JSONResponse (orjson when available)
+    return dumps(data)
+
+
+def render_products(rows: list[Product]) -> bytes:
+    return render_json([p.model_dump() for p in rows])
+
+
+def render_related(ids: list[int], rows: list) -> bytes:
+    # Keep the top-k order; products deleted since the index was built are left out
+    by_id = {row.id: row for row in rows}
+    return rows_to_json([by_id[i] for i in ids if i in by_id])
+
+
+def cache_product(product: Product, store: bool = True):
+    # Render a product into product_cache (unless store is False) and remember its slug
+    entry = render_cached(render_json(product.model_dump()))
+    if store:
+        product_cache.set(product.id, entry)
+        slug_cache.set(product.slug, product.id)
+    return entry
+
+
+# Columns a search result depends on besides the products it shows
+SEARCH_COLUMNS = ("id", "title", "description", "slug")
+
+
+@dataclass(frozen=True)
+class ListingQuery:
+    """
+    One catalog listing page request. Holds everything the sync and async
+    list_products handlers share: cache key, SQL statement, rendering and
+    caching of the page; the handlers only run the query their own way.
+    """
+
+    limit: int
+    cursor: Optional[str] = None
+    sort: ProductSort = "id"
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    in_stock: Optional[bool] = None
+    currency: Optional[str] = None
+
+    def cache_key(self, snapshot) -> tuple:
+        # The snapshot version keeps pages of an older snapshot from being served
+        version = snapshot.version if snapshot is not None else None
+        currency = self.currency and self.currency.upper()
+        return ("list", self.limit, self.cursor, self.sort, self.min_price, self.max_price, self.in_stock, currency, version)
+
+    def _filters(self) -> tuple:
+        return (self.limit, self.cursor, self.sort, self.min_price, self.max_price, self.in_stock, self.currency)
+
+    def statement(self):
+        return build_listing_query(*self._filters())
+
+    def columns(self) -> tuple[str, ...]:
+        # Product columns deciding which rows the page shows ("id": any new product may enter it)
+        columns = ["id"]
+        if self.sort != "id" or self.min_price is not None or self.max_price is not None:
+            columns.append("price_cents")
+        if self.in_stock is not None:
+            columns.append("stock")
+        if self.currency:
+            columns.append("currency")
+        return tuple(columns)
+
+    def page(self, rows: list, key: tuple, generation: int, store: bool = True) -> CachedResponse:
+        # Render the page (rows hold one extra row when there is a next one) and cache
+        # it, unless store is False (rows from a lagging replica)
+        page = rows[: self.limit]
+        entry = render_cached(rows_to_json(page), next_cursor_headers(next_page_cursor(rows, self.limit, self.sort)))
+        if store:
+            listing_cache.set(key, entry, product_ids=[row.id for row in page], columns=self.columns(), generation=generation)
+        return entry
+
+    def snapshot_page(self, snapshot, key: tuple, generation: int) -> CachedResponse:
+        # Filter, paginate and render from the catalog snapshot: CPU only, so the
+        # async handler runs it in a worker thread
+        return self.page(snapshot.listing(*self._filters()), key, generation)
+
+
+def search_cache_key(q: str, limit: int) -> tuple:
+    return ("search", q.strip().lower(), limit)
+
+
+def search_page(rows: list[Product], key: tuple, generation: int, store: bool = True) -> CachedResponse:
+    # Render search results and cache them unless store is False
+    entry = render_cached(render_products(rows))
+    if store:
+        listing_cache.set(key, entry, product_ids=[p.id for p in rows], columns=SEARCH_COLUMNS, generation=generation)
+    return entry
+
+
+def related_page(
+    product_id: int, ids: list[int], rows: list, key: tuple, generation: int, store: bool = True
+) -> CachedResponse:
+    # Render a related-products list and cache it unless store is False; orders of
+    # this product change its list, so the entry is tagged with it too
+    entry = render_cached(render_related(ids, rows))
+    if store:
+        listing_cache.set(key, entry, product_ids=[product_id, *ids], generation=generation)
+    return entry
+
+
+def commit_product(session: Session) -> None:
+    # Commit a created/updated product; a slug already in use is a 409
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Slug already in use")
+
 
 @router.get("/", response_model=list[Product])
-def list_products(session: SessionDep):
-    # Return all products from the database
-    return session.exec(select(Product)).all()
+def list_products(
+    request: Request,
+    session: ReadSessionDep,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: ProductSort = "id",
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+):
+    # Return one page of products; the next page cursor is sent in the X-Next-Cursor header
+    # (served from the catalog snapshot when enabled)
+    listing = ListingQuery(limit, cursor, sort, min_price, max_price, in_stock, currency)
+    snapshot = current_snapshot()
+    key = listing.cache_key(snapshot)
+    entry = listing_cache.get(key)
+    if entry is None:
+        generation = listing_cache.generation
+        if snapshot is not None:
+            entry = listing.snapshot_page(snapshot, key, generation)
+        else:
+            entry = listing.page(session.exec(listing.statement()).all(), key, generation, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+@router.get("/search", response_model=list[Product])
+def search(
+    request: Request,
+    session: ReadSessionDep,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+):
+    # Full-text search over title, description and slug (prefix matching, ranked)
+    key = search_cache_key(q, limit)
+    entry = listing_cache.get(key)
+    if entry is None:
+        generation = listing_cache.generation
+        entry = search_page(search_products(session, q, limit), key, generation, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+@router.get("/cache/stats")
+def product_cache_stats(admin: User = Depends(require_admin)):
+    # Hit/miss counters of the product read caches (admin only)
+    return cache_stats()
+
+
+@router.get("/snapshot/stats")
+def catalog_snapshot_stats(admin: User = Depends(require_admin)):
+    # Size, version and memory use of the in-memory catalog snapshot (admin only)
+    stats = snapshot_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Catalog snapshot is not enabled")
+    return stats
+
+
+@router.get("/export")
+def export_catalog(
+    session: SessionDep,
+    format: CatalogFormat = "csv",
+    admin: User = Depends(require_admin),
+):
+    # Stream the whole catalog as CSV or NDJSON, batch by batch (admin only)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_products(session, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
+
+@router.post("/import")
+async def import_catalog(
+    request: Request,
+    session: SessionDep,
+    format: CatalogFormat = "csv",
+    admin: User = Depends(require_admin),
+):
+    """
+    Bulk upsert products by slug from a CSV (with header) or NDJSON request
+    body. The body is read as a stream and written in large batches, so the
+    catalog never has to fit in memory. Returns counts and per-row errors.
+    """
+    def body_chunks():
+        # Pull the request body from the event loop while the import runs in a worker thread
+        stream = request.stream()
+        while True:
+            try:
+                yield anyio.from_thread.run(stream.__anext__)
+            except StopAsyncIteration:
+                return
+
+    report = await run_in_threadpool(
+        import_products, session, iter_rows(iter_lines(body_chunks()), format)
+    )
+    if report["inserted"] or report["updated"]:
+        invalidate_products()
+        mark_recent_write(admin.email)
+    return report
+
+
+@router.patch("/")
+def patch_products(
+    body: BulkProductPatch,
+    session: SessionDep,
+    admin: User = Depends(require_admin),
+):
+    """
+    Apply partial stock/price updates to many products in one transaction.
+    Use stock_delta (stock += n) instead of stock to avoid overwriting
+    decrements made by concurrent orders. Nothing is written when any
+    product fails validation; all errors are returned at once.
+    """
+    updated, errors = apply_product_patches(session, [p.model_dump() for p in body.products])
+    if errors:
+        session.rollback()
+        raise HTTPException(status_code=400, detail={"errors": errors})
+
+    session.commit()
+    changed = set()
+    for p in body.products:
+        if p.stock is not None or p.stock_delta is not None:
+            changed.add("stock")
+        if p.price_cents is not None:
+            changed.add("price_cents")
+    invalidate_products([p.id for p in body.products], columns=changed)
+    mark_recent_write(admin.email)
+    return {"updated": updated}
 
 
 @router.post("/", response_model=Product, status_code=201)
@@ -25,18 +368,57 @@ def create_product(
     # Create a new product (admin only)
     product = Product.model_validate(product_in)
     session.add(product)
-    session.commit()
+    commit_product(session)
     session.refresh(product)
+    invalidate_products([product.id])
+    mark_recent_write(admin.email)
     return product
 
 
+@router.get("/by-slug/{slug}", response_model=Product)
+def get_product_by_slug(slug: str, request: Request, session: ReadSessionDep):
+    # Retrieve a single product by slug (unique index lookup, then the product cache)
+    product_id = slug_cache.get(slug)
+    entry = product_cache.get(product_id) if product_id is not None else None
+    if entry is None:
+        product = session.exec(select(Product).where(Product.slug == slug)).first()
+        if not product:
+            raise HTTPException(status_code=404)
+        entry = cache_product(product, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+@router.get("/{product_id}/related", response_model=list[Product])
+def related_products(
+    product_id: int,
+    request: Request,
+    session: ReadSessionDep,
+    limit: int = Query(RELATED_TOP_K, ge=1, le=RELATED_TOP_K),
+):
+    # Products most often bought together with this one (precomputed top-k, see app.recommendations)
+    key = related_cache_key(product_id, limit)
+    entry = listing_cache.get(key)
+    if entry is None:
+        generation = listing_cache.generation
+        row = session.get(RelatedProducts, product_id)
+        if row is None and session.get(Product, product_id) is None:
+            raise HTTPException(status_code=404)
+        ids = related_ids(row)[:limit]
+        rows = session.exec(select(*PRODUCT_COLUMNS).where(Product.id.in_(ids))).all() if ids else []
+        entry = related_page(product_id, ids, rows, key, generation, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
 @router.get("/{product_id}", response_model=Product)
-def get_product(product_id: int, session: SessionDep):
-    # Retrieve a single product by ID
-    product = session.get(Product, product_id)
-    if not product:
-        raise HTTPException(status_code=404)
-    return product
+def get_product(product_id: int, request: Request, session: ReadSessionDep):
+    # Retrieve a single product by ID (served from the product cache when possible)
+    entry = product_cache.get(product_id)
+    if entry is None:
+        product = session.get(Product, product_id)
+        if not product:
+            raise HTTPException(status_code=404)
+        entry = cache_product(product, cacheable_read(session))
+    return cached_json_response(request, entry)
 
 
 @router.put("/{product_id}", response_model=Product)
@@ -51,12 +433,18 @@ def update_product(
     if not product:
         raise HTTPException(status_code=404)
 
+    old_slug = product.slug
+    changed = []
     for k, v in product_in.model_dump().items():
+        if getattr(product, k) != v:
+            changed.append(k)
         setattr(product, k, v)
 
     session.add(product)
-    session.commit()
+    commit_product(session)
     session.refresh(product)
+    invalidate_products([product_id], [old_slug], columns=changed)
+    mark_recent_write(admin.email)
     return product
 
 
@@ -71,6 +459,10 @@ def delete_product(
     if not product:
         raise HTTPException(status_code=404)
 
+    slug = product.slug
     session.delete(product)
     session.commit()
+    # Removing a row only changes the pages showing it (keyset cursors of later pages stay valid)
+    invalidate_products([product_id], [slug], columns=[])
+    mark_recent_write(admin.email)
     return
@@ -0,0 +1,123 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select
+
+from app.db import cacheable_read
+from app.dependencies import AsyncReadSessionDep
+from app.models.product import Product
+from app.models.recommendations import RelatedProducts
+from app.recommendations import RELATED_TOP_K, related_cache_key, related_ids
+from app.search import build_search_statement
+from app.catalog_snapshot import current_snapshot
+from app.cache import cached_json_response, listing_cache, product_cache, slug_cache
+from app.routes.products import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    PRODUCT_COLUMNS,
+    ListingQuery,
+    ProductSort,
+    cache_product,
+    related_page,
+    search_cache_key,
+    search_page,
+)
+
+# Async versions of the catalog read endpoints (DB_ASYNC mode).
+# Registered before the sync router, so they take over these paths while
+# admin writes keep using the sync handlers.
+router = APIRouter(prefix="/products", tags=["products"])
+
+
+@router.get("/", response_model=list[Product])
+async def list_products(
+    request: Request,
+    session: AsyncReadSessionDep,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: ProductSort = "id",
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    currency: Optional[str] = Query(None, min_length=3, max_length=3),
+):
+    # Return one page of products; the next page cursor is sent in the X-Next-Cursor header
+    # (served from the catalog snapshot when enabled, filtered in a worker thread)
+    listing = ListingQuery(limit, cursor, sort, min_price, max_price, in_stock, currency)
+    snapshot = current_snapshot()
+    key = listing.cache_key(snapshot)
+    entry = listing_cache.get(key)
+    if entry is None:
+        generation = listing_cache.generation
+        if snapshot is not None:
+            entry = await run_in_threadpool(listing.snapshot_page, snapshot, key, generation)
+        else:
+            rows = (await session.exec(listing.statement())).all()
+            entry = listing.page(rows, key, generation, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+@router.get("/search", response_model=list[Product])
+async def search(
+    request: Request,
+    session: AsyncReadSessionDep,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+):
+    # Full-text search over title, description and slug (prefix matching, ranked)
+    key = search_cache_key(q, limit)
+    entry = listing_cache.get(key)
+    if entry is None:
+        generation = listing_cache.generation
+        stmt = build_search_statement(session.bind.dialect.name, q, limit)
+        rows = (await session.execute(stmt)).scalars().all() if stmt is not None else []
+        entry = search_page(rows, key, generation, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+@router.get("/by-slug/{slug}", response_model=Product)
+async def get_product_by_slug(slug: str, request: Request, session: AsyncReadSessionDep):
+    # Retrieve a single product by slug (unique index lookup, then the product cache)
+    product_id = slug_cache.get(slug)
+    entry = product_cache.get(product_id) if product_id is not None else None
+    if entry is None:
+        product = (await session.exec(select(Product).where(Product.slug == slug))).first()
+        if not product:
+            raise HTTPException(status_code=404)
+        entry = cache_product(product, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+@router.get("/{product_id:int}/related", response_model=list[Product])
+async def related_products(
+    product_id: int,
+    request: Request,
+    session: AsyncReadSessionDep,
+    limit: int = Query(RELATED_TOP_K, ge=1, le=RELATED_TOP_K),
+):
+    # Products most often bought together with this one (precomputed top-k, see app.recommendations)
+    key = related_cache_key(product_id, limit)
+    entry = listing_cache.get(key)
+    if entry is None:
+        generation = listing_cache.generation
+        row = await session.get(RelatedProducts, product_id)
+        if row is None and await session.get(Product, product_id) is None:
+            raise HTTPException(status_code=404)
+        ids = related_ids(row)[:limit]
+        rows = (await session.exec(select(*PRODUCT_COLUMNS).where(Product.id.in_(ids)))).all() if ids else []
+        entry = related_page(product_id, ids, rows, key, generation, cacheable_read(session))
+    return cached_json_response(request, entry)
+
+
+# ":int" keeps this catch-all from shadowing sync-only paths such as /products/export
+@router.get("/{product_id:int}", response_model=Product)
+async def get_product(product_id: int, request: Request, session: AsyncReadSessionDep):
+    # Retrieve a single product by ID (served from the product cache when possible)
+    entry = product_cache.get(product_id)
+    if entry is None:
+        product = await session.get(Product, product_id)
+        if not product:
+            raise HTTPException(status_code=404)
+        entry = cache_product(product, cacheable_read(session))
+    return cached_json_response(request, entry)
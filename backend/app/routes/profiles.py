@@ -0,0 +1,66 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from app.auth import require_admin
+from app.models.user import User
+from app.profiling import profile_buffer, pstats_bytes, pstats_text
+from app.responses import dumps
+
+# Admin access to the request profiles kept by ProfilingMiddleware
+router = APIRouter(prefix="/profiles", tags=["profiling"])
+
+ProfileFormat = Literal["json", "pstats", "text", "speedscope"]
+
+
+@router.get("/")
+def list_profiles(admin: User = Depends(require_admin)):
+    # Newest first: request, timings and SQL statement counts of each stored profile
+    return [record.summary() for record in profile_buffer.list()]
+
+
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: int,
+    format: ProfileFormat = "json",
+    admin: User = Depends(require_admin),
+):
+    """
+    One stored profile. json: summary plus the SQL executed during the
+    request; pstats: binary cProfile stats (pstats.Stats / snakeviz);
+    text: top functions by cumulative time; speedscope: sampled stacks for
+    https://www.speedscope.app. pstats/text need a cprofile-mode profile
+    (process-wide: it includes concurrent requests), speedscope a
+    sample-mode one.
+    """
+    record = profile_buffer.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404)
+
+    if format == "json":
+        return {**record.summary(), "sql": record.queries, "dropped_queries": record.dropped_queries}
+
+    if format in ("pstats", "text"):
+        if record.stats is None:
+            raise HTTPException(status_code=400, detail="Profile was not taken in cprofile mode")
+        if format == "text":
+            return Response(content=pstats_text(record), media_type="text/plain")
+        return Response(
+            content=pstats_bytes(record),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+        )
+
+    if record.speedscope is None:
+        raise HTTPException(status_code=400, detail="Profile was not taken in sample mode")
+    return Response(
+        content=dumps(record.speedscope),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'},
+    )
+
+
+@router.delete("/", status_code=204)
+def clear_profiles(admin: User = Depends(require_admin)):
+    # Drop every stored profile
+    profile_buffer.clear()
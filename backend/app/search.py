@@ -0,0 +1,128 @@
+import re
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select
+
+from app.models.product import Product
+
+# Full-text index over the product catalog (SQLite FTS5).
+# It is an external-content table: the text lives in "product" and the index
+# is kept in sync by triggers, so every write path (ORM, bulk SQL) updates it
+# inside the same transaction. Other databases fall back to a LIKE scan.
+FTS_TABLE = "product_fts"
+
+# Column weights for bm25 ranking: title, description, slug
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, slug,
+        content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, slug)
+        VALUES (new.id, new.title, new.description, new.slug);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, slug)
+        VALUES ('delete', old.id, old.title, old.description, old.slug);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, slug ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, slug)
+        VALUES ('delete', old.id, old.title, old.description, old.slug);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, slug)
+        VALUES (new.id, new.title, new.description, new.slug);
+    END
+    """,
+]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _index_exists(conn: Connection) -> bool:
+    row = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    return row is not None
+
+
+def ensure_search_index(engine: Engine) -> None:
+    # Create the FTS table and its sync triggers; index existing rows the first time
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        existed = _index_exists(conn)
+        for ddl in _DDL:
+            conn.execute(text(ddl))
+        if not existed:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    # Re-index the whole catalog from the product table
+    if engine.dialect.name != "sqlite":
+        return
+    ensure_search_index(engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def search_tokens(q: str) -> list[str]:
+    # Searchable words of free text, shared by the FTS5 and LIKE backends
+    return _TOKEN_RE.findall(q.lower())
+
+
+def build_match_query(tokens: list[str]) -> str:
+    # FTS5 query for the search words: every word must match, as a prefix
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def build_search_statement(dialect: str, q: str, limit: int):
+    # Select statement for a search (None when the query has no searchable words)
+    tokens = search_tokens(q)
+    if not tokens:
+        return None
+
+    if dialect != "sqlite":
+        # Portable fallback: every word must appear in title, description or slug
+        conditions = [
+            or_(
+                Product.title.ilike(f"%{token}%"),
+                Product.description.ilike(f"%{token}%"),
+                Product.slug.ilike(f"%{token}%"),
+            )
+            for token in tokens
+        ]
+        return select(Product).where(and_(*conditions)).order_by(Product.title).limit(limit)
+
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    stmt = text(
+        f"""
+        SELECT product.* FROM {FTS_TABLE}
+        JOIN product ON product.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match
+        ORDER BY bm25({FTS_TABLE}, {weights})
+        LIMIT :limit
+        """
+    ).bindparams(match=build_match_query(tokens), limit=limit)
+    return select(Product).from_statement(stmt)
+
+
+def search_products(session: Session, q: str, limit: int) -> list[Product]:
+    # Return products matching the query, best bm25 rank first
+    stmt = build_search_statement(session.get_bind().dialect.name, q, limit)
+    if stmt is None:
+        return []
+    return list(session.execute(stmt).scalars())
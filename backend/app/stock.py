@@ -0,0 +1,99 @@
+from sqlalchemy import update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.product import Product
+
+# SQLite limits bound parameters per statement, so large IN lists are split
+IN_CHUNK_SIZE = 900
+
+
+def merge_lines(items: list[dict]) -> dict[int, int]:
+    # Sum quantities of repeated products: {product_id: total_quantity}
+    lines: dict[int, int] = {}
+    for it in items:
+        pid = int(it["product_id"])
+        lines[pid] = lines.get(pid, 0) + int(it["quantity"])
+    return lines
+
+
+def stock_query(ids: list[int]):
+    return select(Product.id, Product.stock).where(Product.id.in_(ids))
+
+
+def load_stock(session: Session, product_ids: list[int]) -> dict[int, int]:
+    # Current stock for the given products: {product_id: stock}, one query per chunk
+    stock_map: dict[int, int] = {}
+    for i in range(0, len(product_ids), IN_CHUNK_SIZE):
+        stock_map.update(session.exec(stock_query(product_ids[i:i + IN_CHUNK_SIZE])).all())
+    return stock_map
+
+
+async def load_stock_async(session: AsyncSession, product_ids: list[int]) -> dict[int, int]:
+    # Async twin of load_stock
+    stock_map: dict[int, int] = {}
+    for i in range(0, len(product_ids), IN_CHUNK_SIZE):
+        stock_map.update((await session.exec(stock_query(product_ids[i:i + IN_CHUNK_SIZE]))).all())
+    return stock_map
+
+
+def _reserve_statement(pid: int, qty: int):
+    # Conditional decrement: matches no row when stock is insufficient
+    return (
+        update(Product)
+        .where(Product.id == pid, Product.stock >= qty)
+        .values(stock=Product.stock - qty)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _stock_errors(failed: dict[int, int], available: dict[int, int]) -> list[dict]:
+    return [
+        {
+            "product_id": pid,
+            "reason": "OUT_OF_STOCK" if pid in available else "NOT_FOUND",
+            "stock": available.get(pid, 0),
+            "requested": qty,
+        }
+        for pid, qty in failed.items()
+    ]
+
+
+def reserve_stock(session: Session, lines: dict[int, int]) -> list[dict]:
+    """
+    Atomically decrement stock for every line with a conditional UPDATE
+    (stock = stock - qty WHERE stock >= qty), so concurrent orders can never
+    oversell. Returns one error per line that could not be reserved; when the
+    list is not empty the caller must roll back the transaction.
+    """
+    failed: dict[int, int] = {}
+
+    # Sorted ids give every transaction the same lock order (no deadlocks on row-locking databases)
+    for pid in sorted(lines):
+        result = session.execute(_reserve_statement(pid, lines[pid]))
+        if result.rowcount != 1:
+            failed[pid] = lines[pid]
+
+    if not failed:
+        return []
+
+    available = dict(
+        session.exec(select(Product.id, Product.stock).where(Product.id.in_(list(failed)))).all()
+    )
+    return _stock_errors(failed, available)
+
+
+async def reserve_stock_async(session: AsyncSession, lines: dict[int, int]) -> list[dict]:
+    # Async twin of reserve_stock
+    failed: dict[int, int] = {}
+
+    for pid in sorted(lines):
+        result = await session.execute(_reserve_statement(pid, lines[pid]))
+        if result.rowcount != 1:
+            failed[pid] = lines[pid]
+
+    if not failed:
+        return []
+
+    rows = await session.exec(select(Product.id, Product.stock).where(Product.id.in_(list(failed))))
+    return _stock_errors(failed, dict(rows.all()))
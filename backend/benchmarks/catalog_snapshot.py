@@ -0,0 +1,97 @@
+"""
+Memory use and listing latency of the in-memory catalog snapshot.
+
+Seeds a catalog, builds a CatalogSnapshot from it and reports build time,
+memory per product (projected to 100k products) and the cost of a stock
+patch. Then times the same listing pages through SQLite (build_listing_query)
+and through the snapshot, for filters of different selectivity. The snapshot
+uses NumPy when installed and a plain Python loop otherwise; run once with
+and once without NumPy to compare.
+
+Run from the backend folder:
+    python -m benchmarks.catalog_snapshot --products 100000 --repeat 20
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from app.catalog_snapshot import load_snapshot, np
+from app.db import build_engine
+from app.models.product import Product
+from app.routes.products import build_listing_query
+
+# name -> build_listing_query / CatalogSnapshot.listing keyword arguments
+CASES = {
+    "first page": {},
+    "price_asc": {"sort": "price_asc"},
+    "price range": {"min_price": 1_000, "max_price": 1_500},
+    "in stock, EUR": {"in_stock": True, "currency": "EUR"},
+    "rare match": {"min_price": 9_990, "in_stock": False, "sort": "price_desc"},
+}
+
+
+def timed(fn, repeat: int) -> float:
+    # Median milliseconds over repeat calls
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"filtering: {'NumPy' if np is not None else 'pure Python (install numpy for vectorized filters)'}")
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.execute(
+                insert(Product.__table__),
+                [
+                    {
+                        "title": f"Product {i % 5_000}",
+                        "description": None,
+                        "price_cents": rng.randint(100, 10_000),
+                        "currency": rng.choice(["EUR", "USD", "GBP"]),
+                        "stock": rng.choice([0, 0, 5, 20, 100]),
+                        "slug": f"p-{i}",
+                    }
+                    for i in range(args.products)
+                ],
+            )
+            session.commit()
+
+        started = time.perf_counter()
+        snapshot = load_snapshot(engine)
+        build_ms = (time.perf_counter() - started) * 1000
+        stats = snapshot.stats()
+        print(f"\n{stats['products']} products: built in {build_ms:.0f} ms, {stats['memory_bytes'] / 1e6:.1f} MB")
+        print(f"  {stats['bytes_per_product']} bytes/product, {stats['memory_bytes_per_100k_products'] / 1e6:.1f} MB per 100k products")
+        patch_ms = timed(lambda: snapshot.with_stock({0: 1, len(snapshot) - 1: 2}), args.repeat)
+        print(f"  stock patch (copy of the stock column): {patch_ms:.2f} ms")
+
+        print(f"\n{'listing':<16} {'SQLite':>9} {'snapshot':>9} {'speedup':>8}  (ms per page of {args.limit})")
+        with Session(engine) as session:
+            for name, filters in CASES.items():
+                sql = timed(lambda: session.exec(build_listing_query(args.limit, **filters)).all(), args.repeat)
+                mem = timed(lambda: snapshot.listing(args.limit, **filters), args.repeat)
+                print(f"{name:<16} {sql:>9.3f} {mem:>9.3f} {sql / mem:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Read throughput of SQLite under concurrent writers, before and after the
+engine configuration in app/db.py.
+
+"before" reproduces the old engine: rollback journal, synchronous=FULL.
+"after" uses the pragmas from app.db.SQLITE_PRAGMAS (WAL, synchronous=NORMAL,
+busy_timeout, mmap and page cache).
+
+Run from the backend folder:
+    python -m benchmarks.db_concurrency --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel
+
+from app.db import SQLITE_PRAGMAS, build_engine
+from app.models.product import Product
+
+BEFORE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+
+def seed(engine, products: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            Product(title=f"Product {i}", price_cents=100 + i, currency="EUR", stock=1_000_000, slug=f"p-{i}")
+            for i in range(products)
+        )
+        session.commit()
+
+
+def run(pragmas: dict, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", pragmas=pragmas, echo=False)
+        seed(engine, args.products)
+
+        stop = threading.Event()
+        counts = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+        lock = threading.Lock()
+
+        def reader(seed_: int):
+            rng = random.Random(seed_)
+            done = errors = 0
+            with engine.connect() as conn:
+                while not stop.is_set():
+                    try:
+                        conn.execute(
+                            text("SELECT * FROM product WHERE id = :id"), {"id": rng.randint(1, args.products)}
+                        ).fetchall()
+                        conn.commit()
+                        done += 1
+                    except OperationalError:
+                        conn.rollback()
+                        errors += 1
+            with lock:
+                counts["reads"] += done
+                counts["read_errors"] += errors
+
+        def writer(seed_: int):
+            rng = random.Random(seed_)
+            done = errors = 0
+            with engine.connect() as conn:
+                while not stop.is_set():
+                    try:
+                        conn.execute(
+                            text("UPDATE product SET stock = stock - 1 WHERE id = :id"),
+                            {"id": rng.randint(1, args.products)},
+                        )
+                        conn.commit()
+                        done += 1
+                    except OperationalError:
+                        conn.rollback()
+                        errors += 1
+            with lock:
+                counts["writes"] += done
+                counts["write_errors"] += errors
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    return {k: v / args.seconds if not k.endswith("errors") else v for k, v in counts.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds}s per run")
+    print(f"{'config':<8} {'reads/s':>10} {'writes/s':>10} {'read err':>9} {'write err':>10}")
+    for name, pragmas in (("before", BEFORE_PRAGMAS), ("after", SQLITE_PRAGMAS)):
+        r = run(pragmas, args)
+        print(f"{name:<8} {r['reads']:>10.0f} {r['writes']:>10.0f} {r['read_errors']:>9} {r['write_errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Order ingestion throughput with and without group commit.
+
+Places orders from 1, 10 and 100 concurrent clients (threads) on a fresh
+SQLite database, either the per-request way (place_order + commit in each
+client's own session, as POST /orders/ does) or through one OrderWriter
+that places every queued order in a shared transaction. Prints orders/sec
+and the average number of orders per commit.
+
+SQLite's synchronous setting decides what a commit costs: with NORMAL (the
+app default, WAL) a commit does not fsync, with FULL every commit does.
+
+Run from the backend folder:
+    python -m benchmarks.group_commit --orders 2000 --clients 1 10 100 --synchronous FULL
+"""
+import argparse
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from app.db import SQLITE_PRAGMAS, build_engine
+from app.group_commit import OrderWriter
+from app.models.product import Product
+from app.ordering import place_order
+
+PRODUCTS = 1_000
+
+
+def seeded_engine(path: Path, synchronous: str):
+    engine = build_engine(f"sqlite:///{path}", pragmas={**SQLITE_PRAGMAS, "synchronous": synchronous}, echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(
+            insert(Product.__table__),
+            [
+                {"title": f"Product {i}", "price_cents": 1_000, "currency": "EUR", "stock": 1_000_000, "slug": f"p-{i}"}
+                for i in range(PRODUCTS)
+            ],
+        )
+        session.commit()
+    return engine
+
+
+def carts(count: int) -> list[list[dict]]:
+    rng = random.Random(7)
+    return [
+        [{"product_id": pid, "quantity": 1} for pid in rng.sample(range(1, PRODUCTS + 1), rng.randint(1, 3))]
+        for _ in range(count)
+    ]
+
+
+def run(engine, clients: int, orders: list[list[dict]], writer=None) -> float:
+    # Orders/sec with `clients` threads placing the given carts
+    def per_request(items):
+        with Session(engine) as session:
+            place_order(session, "bench@example.com", items)
+            session.commit()
+
+    def grouped(items):
+        writer.submit("bench@example.com", items).result()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(grouped if writer else per_request, orders))
+    return len(orders) / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2_000, help="orders per run")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--synchronous", default=SQLITE_PRAGMAS["synchronous"], choices=["OFF", "NORMAL", "FULL"])
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    orders = carts(args.orders)
+    print(f"synchronous={args.synchronous}, {args.orders} orders per run")
+    print(f"\n{'clients':>7} {'per-request':>12} {'group commit':>13} {'speedup':>8} {'orders/commit':>14}  (orders/sec)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for clients in args.clients:
+            engine = seeded_engine(Path(tmp) / f"single-{clients}.db", args.synchronous)
+            single = run(engine, clients, orders)
+            engine.dispose()
+
+            engine = seeded_engine(Path(tmp) / f"group-{clients}.db", args.synchronous)
+            writer = OrderWriter(engine, max_batch=args.max_batch, max_wait=0)
+            writer.start()
+            grouped = run(engine, clients, orders, writer)
+            writer.stop()
+            engine.dispose()
+
+            print(
+                f"{clients:>7} {single:>12.0f} {grouped:>13.0f} {grouped / single:>7.1f}x"
+                f" {writer.stats()['avg_batch']:>14}"
+            )
+
+
+if __name__ == "__main__":
+    main()
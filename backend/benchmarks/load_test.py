@@ -0,0 +1,375 @@
+"""
+Mixed-workload load test of the whole API.
+
+Seeds a synthetic SQLite database (products, users, orders), then drives the
+real ASGI app with concurrent clients running a weighted mix of catalog
+browsing, product pages, search, cart validation, checkout and order
+history. Reports requests per second and p50/p95/p99 latency per endpoint,
+and can save the results as JSON and compare them with a previous run.
+
+By default the app runs in-process (httpx ASGITransport, no network);
+--server starts it under uvicorn on a local port instead.
+
+Run from the backend folder:
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --out before.json
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --compare before.json
+    python -m benchmarks.load_test --server --uvicorn-workers 4 --mix browse=60,search=20,orders=20
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+# Default weights of each operation in the request mix
+DEFAULT_MIX = {"browse": 30, "product": 20, "search": 15, "validate": 15, "checkout": 5, "orders": 15}
+
+ADJECTIVES = ["red", "blue", "green", "classic", "modern", "vintage", "compact", "wireless", "organic", "premium"]
+NOUNS = ["chair", "lamp", "mug", "backpack", "headphones", "notebook", "sneakers", "jacket", "kettle", "watch"]
+CURRENCIES = ["EUR", "USD"]
+SEED_BATCH_SIZE = 5000
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    # "browse=60,search=40" -> {"browse": 60, "search": 40}
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def seed_database(products: int, users: int, orders: int, seed: int) -> None:
+    # Fill the configured database (DATABASE_URL) with deterministic synthetic data
+    from sqlalchemy import insert
+
+    from app.db import create_db_and_tables, engine
+    from app.models.order import Order
+    from app.models.order_item import OrderItem
+    from app.models.product import Product
+    from app.models.user import User
+
+    create_db_and_tables()
+    rng = random.Random(seed)
+    prices = {}
+
+    def batches(rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= SEED_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def product_rows():
+        for i in range(1, products + 1):
+            price = rng.randint(100, 50_000)
+            prices[i] = price
+            title = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+            yield {
+                "id": i,
+                "title": title.capitalize(),
+                "description": f"Synthetic product {i} for load testing",
+                "price_cents": price,
+                "currency": CURRENCIES[i % len(CURRENCIES)],  # checkout carts stay in one currency
+                "stock": 1_000_000,  # checkouts never run out during a run
+                "slug": title.replace(" ", "-"),
+            }
+
+    def user_rows():
+        # Login is not part of the mix, so no real bcrypt hashes are needed
+        for i in range(users):
+            yield {"email": f"user{i}@example.com", "hashed_password": "!", "is_admin": False}
+
+    now = datetime.utcnow()
+    items: list[dict] = []
+
+    def order_rows():
+        item_id = 1
+        for order_id in range(1, orders + 1):
+            lines = [(rng.randint(1, products), rng.randint(1, 3)) for _ in range(rng.randint(1, 3))]
+            for pid, qty in lines:
+                items.append({
+                    "id": item_id,
+                    "order_id": order_id,
+                    "product_id": pid,
+                    "unit_price_cents": prices[pid],
+                    "quantity": qty,
+                })
+                item_id += 1
+            yield {
+                "id": order_id,
+                "user_email": f"user{rng.randrange(users)}@example.com",
+                "status": "paid",
+                "total_cents": sum(prices[pid] * qty for pid, qty in lines),
+                "currency": "EUR",
+                "created_at": now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+            }
+
+    with engine.begin() as conn:
+        for batch in batches(product_rows()):
+            conn.execute(insert(Product.__table__), batch)
+        for batch in batches(user_rows()):
+            conn.execute(insert(User.__table__), batch)
+        for batch in batches(order_rows()):
+            conn.execute(insert(Order.__table__), batch)
+            conn.execute(insert(OrderItem.__table__), items)
+            items.clear()
+
+
+class Workload:
+    # Builds random requests for each operation (deterministic per worker seed)
+
+    def __init__(self, rng: random.Random, products: int, users: int):
+        self.rng = rng
+        self.products = products
+        self.users = users
+
+    def user_headers(self) -> dict:
+        return {"X-User-Email": f"user{self.rng.randrange(self.users)}@example.com"}
+
+    def cart(self, max_lines: int) -> dict:
+        return {"items": [
+            {"product_id": self.rng.randint(1, self.products), "quantity": self.rng.randint(1, 3)}
+            for _ in range(self.rng.randint(1, max_lines))
+        ]}
+
+    def checkout_cart(self) -> dict:
+        # Orders cannot mix currencies: pick products with the same id remainder
+        offset = self.rng.randrange(len(CURRENCIES))
+        last = (self.products - offset) // len(CURRENCIES)
+        return {"items": [
+            {"product_id": offset + len(CURRENCIES) * self.rng.randint(1, last), "quantity": self.rng.randint(1, 3)}
+            for _ in range(self.rng.randint(1, 3))
+        ]}
+
+    def request(self, op: str) -> tuple[str, str, dict]:
+        # (method, url, httpx keyword arguments)
+        rng = self.rng
+        if op == "browse":
+            params = {"limit": rng.choice([20, 50, 100]), "sort": rng.choice(["id", "price_asc", "price_desc"])}
+            if rng.random() < 0.3:
+                params["min_price"] = rng.randint(100, 20_000)
+            if rng.random() < 0.2:
+                params["currency"] = rng.choice(CURRENCIES)
+            return "GET", "/products/", {"params": params}
+        if op == "product":
+            return "GET", f"/products/{rng.randint(1, self.products)}", {}
+        if op == "search":
+            q = rng.choice(ADJECTIVES) if rng.random() < 0.5 else f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+            return "GET", "/products/search", {"params": {"q": q, "limit": 20}}
+        if op == "validate":
+            return "POST", "/checkout/validate", {"json": self.cart(10)}
+        if op == "checkout":
+            return "POST", "/checkout/", {"json": self.checkout_cart(), "headers": self.user_headers()}
+        return "GET", "/orders/my", {"params": {"limit": 20}, "headers": self.user_headers()}
+
+
+async def run_load(client: httpx.AsyncClient, args, mix: dict[str, int]) -> dict:
+    # Closed-loop clients: each sends its next request as soon as the previous one completes
+    ops, weights = list(mix), list(mix.values())
+    samples: dict[str, list[float]] = {op: [] for op in ops}
+    errors: dict[str, int] = {op: 0 for op in ops}
+    warmup_end = time.perf_counter() + args.warmup
+    end = warmup_end + args.duration
+
+    async def worker(n: int):
+        rng = random.Random(args.seed * 1000 + n)
+        workload = Workload(rng, args.products, args.users)
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                return
+            op = rng.choices(ops, weights)[0]
+            method, url, kwargs = workload.request(op)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - started
+            if started < warmup_end:
+                continue
+            samples[op].append(elapsed)
+            if response.status_code >= 400:
+                errors[op] += 1
+
+    await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+    return {"samples": samples, "errors": errors}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(values: list[float], errors: int, duration: float) -> dict:
+    values = sorted(values)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / duration, 2),
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+def build_report(raw: dict, duration: float, args, mix: dict[str, int]) -> dict:
+    endpoints = {
+        op: summarize(raw["samples"][op], raw["errors"][op], duration) for op in mix
+    }
+    all_samples = [s for op in mix for s in raw["samples"][op]]
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "mode": "uvicorn" if args.server else "in-process",
+        "config": {
+            "products": args.products,
+            "users": args.users,
+            "orders": args.orders,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "uvicorn_workers": args.uvicorn_workers if args.server else None,
+            "mix": mix,
+            "env": {k: v for k, v in os.environ.items() if k.startswith(("DB_", "SQLITE_", "PRODUCT_CACHE", "LISTING_CACHE", "METRICS_", "PROFIL"))},
+        },
+        "total": summarize(all_samples, sum(raw["errors"].values()), duration),
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    header = f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)"
+    if baseline:
+        header += f"  {'rps vs base':>12} {'p95 vs base':>12}"
+    print(header)
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    rows = [*report["endpoints"].items(), ("TOTAL", report["total"])]
+    for name, s in rows:
+        line = (
+            f"{name:<10} {s['requests']:>9} {s['errors']:>7} {s['rps']:>9.1f}"
+            f" {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}"
+        )
+        if baseline:
+            old = baseline["total"] if name == "TOTAL" else baseline["endpoints"].get(name)
+            if old:
+                line += f"  {delta(s['rps'], old['rps']):>12} {delta(s['p95_ms'], old['p95_ms']):>12}"
+        print(line)
+
+
+async def drive_in_process(args, mix: dict[str, int]):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        return await run_load(client, args, mix)
+
+
+async def drive_uvicorn(args, mix: dict[str, int]):
+    # Start uvicorn on the seeded database and wait until it answers /health
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.uvicorn_workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise SystemExit("uvicorn did not start")
+                await asyncio.sleep(0.2)
+            return await run_load(client, args, mix)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of traffic before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. browse=60,search=20,orders=20")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db", type=Path, help="SQLite file to seed (default: a temporary file)")
+    parser.add_argument("--server", action="store_true", help="run the app under uvicorn instead of in-process")
+    parser.add_argument("--uvicorn-workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", type=Path, help="save the results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON results of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or Path(tmp) / "load.db"
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+        # Must be set before app.db is imported: the engines are built from it
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path.resolve()}"
+
+        started = time.perf_counter()
+        seed_database(args.products, args.users, args.orders, args.seed)
+        print(f"seeded {args.products} products, {args.users} users, {args.orders} orders"
+              f" in {time.perf_counter() - started:.1f}s")
+
+        drive = drive_uvicorn if args.server else drive_in_process
+        raw = asyncio.run(drive(args, args.mix))
+
+        from app.db import engine
+        engine.dispose()
+
+    report = build_report(raw, args.duration, args, args.mix)
+    print_report(report, baseline)
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cost of rendering catalog and order history responses.
+
+Compares, for the same listing page, the response_model path (pydantic
+validation + jsonable_encoder + JSONResponse), the previous listing path
+(Product instances + model_dump + json.dumps) and the current one (column
+rows straight to bytes with app.responses.dumps, orjson when installed).
+Each variant includes its query, since the current path also skips building
+ORM instances. Also times order history rendering and reports compressed
+sizes and compression cost of a listing page.
+
+Run from the backend folder:
+    python -m benchmarks.serialization --page-sizes 50 200 1000 --repeat 50
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlmodel import Session, SQLModel, select
+
+from app.compression import brotli, compress
+from app.db import build_engine
+from app.models.product import Product
+from app.responses import dumps, orjson, rows_to_json
+from app.routes.products import PRODUCT_COLUMNS
+
+
+def timed(fn, repeat: int) -> tuple[float, bytes]:
+    # Median milliseconds over repeat calls, plus the last output
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print(f"JSON encoder: {'orjson' if orjson else 'json (install orjson for the fast path)'}")
+    products_adapter = TypeAdapter(list[Product])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(
+                Product(
+                    title=f"Product {i} ñ", description="A fairly ordinary product description " * 3,
+                    price_cents=100 + i, currency="EUR", stock=1_000, slug=f"p-{i}",
+                )
+                for i in range(args.products)
+            )
+            session.commit()
+
+        print(f"\n{'page':>6} {'response_model':>15} {'model_dump':>11} {'rows+dumps':>11} {'speedup':>8}  (ms, incl. query)")
+        for size in args.page_sizes:
+            with Session(engine) as session:
+                def response_model_path():
+                    rows = session.exec(select(Product).order_by(Product.id).limit(size)).all()
+                    content = jsonable_encoder(products_adapter.validate_python(rows, from_attributes=True))
+                    return JSONResponse(content).body
+
+                def model_dump_path():
+                    rows = session.exec(select(Product).order_by(Product.id).limit(size)).all()
+                    return json.dumps(
+                        [p.model_dump() for p in rows], ensure_ascii=False, separators=(",", ":")
+                    ).encode("utf-8")
+
+                def rows_path():
+                    return rows_to_json(session.exec(select(*PRODUCT_COLUMNS).order_by(Product.id).limit(size)).all())
+
+                old, _ = timed(response_model_path, args.repeat)
+                prev, _ = timed(model_dump_path, args.repeat)
+                new, body = timed(rows_path, args.repeat)
+            print(f"{size:>6} {old:>15.3f} {prev:>11.3f} {new:>11.3f} {old / new:>7.1f}x")
+
+        orders = [
+            {
+                "id": i,
+                "user_email": "user@example.com",
+                "status": "paid",
+                "total_cents": 4200,
+                "currency": "EUR",
+                "created_at": (datetime(2025, 1, 1) + timedelta(hours=i)).isoformat(),
+                "items": [
+                    {"product_id": j, "quantity": 1, "unit_price_cents": 1400, "title": f"Product {j}"}
+                    for j in range(3)
+                ],
+            }
+            for i in range(100)
+        ]
+        old, _ = timed(lambda: JSONResponse(jsonable_encoder(orders)).body, args.repeat)
+        new, _ = timed(lambda: dumps(orders), args.repeat)
+        print(f"\norder history page (100 orders): jsonable_encoder {old:.3f} ms, dumps {new:.3f} ms ({old / new:.1f}x)")
+
+        print(f"\nlargest page: {len(body)} bytes")
+        encodings = ["gzip"] + (["br"] if brotli else [])
+        for encoding in encodings:
+            ms, compressed = timed(lambda: compress(body, encoding), args.repeat)
+            print(f"  {encoding:<5} {len(compressed):>9} bytes ({len(compressed) / len(body):.0%}) in {ms:.3f} ms")
+        if not brotli:
+            print("  (install brotli to compare br)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Concurrency stress test for stock reservation.
+
+Fires many parallel POST /orders/ requests at a single product with limited
+stock and checks that stock never goes negative and that the quantities of
+the orders that succeeded add up exactly to the stock that was consumed.
+
+Run from the backend folder:
+    python -m benchmarks.stock_stress --orders 500 --stock 120 --workers 64
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, select
+
+from app.db import build_engine, get_session
+from app.main import app
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500, help="number of parallel checkout attempts")
+    parser.add_argument("--stock", type=int, default=120, help="initial stock of the product")
+    parser.add_argument("--workers", type=int, default=64, help="client threads")
+    parser.add_argument("--max-qty", type=int, default=3, help="max quantity per order")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'stress.db'}")
+        SQLModel.metadata.create_all(engine)
+
+        with Session(engine) as session:
+            product = Product(title="Hot item", price_cents=1000, currency="EUR", stock=args.stock, slug="hot-item")
+            session.add(product)
+            session.commit()
+            product_id = product.id
+
+        def override_session():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = override_session
+        client = TestClient(app)  # no lifespan: the real database is never touched
+        rng = random.Random(42)
+        quantities = [rng.randint(1, args.max_qty) for _ in range(args.orders)]
+
+        def place(i: int) -> int:
+            r = client.post(
+                "/orders/",
+                json={"items": [{"product_id": product_id, "quantity": quantities[i]}]},
+                headers={"X-User-Email": f"user{i}@example.com"},
+            )
+            return r.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            statuses = list(pool.map(place, range(args.orders)))
+        elapsed = time.perf_counter() - started
+        app.dependency_overrides.clear()
+
+        with Session(engine) as session:
+            final_stock = session.get(Product, product_id).stock
+            sold = session.exec(select(func.coalesce(func.sum(OrderItem.quantity), 0))).one()
+            orders = session.exec(select(func.count()).select_from(Order)).one()
+
+    created = statuses.count(201)
+    rejected = statuses.count(409)
+    other = len(statuses) - created - rejected
+
+    print(f"attempts={args.orders} created={created} rejected={rejected} other={other} in {elapsed:.2f}s")
+    print(f"initial_stock={args.stock} final_stock={final_stock} units_sold={sold} orders_in_db={orders}")
+
+    ok = final_stock >= 0 and sold == args.stock - final_stock and orders == created and other == 0
+    print("OK: no oversell" if ok else "FAIL: stock accounting mismatch")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Latency of cart validation against cart size.
+
+Compares the previous per-line lookup (one session.get per cart line) with
+the current single IN query used by /checkout/validate, calling both through
+the same session on a seeded SQLite database.
+
+Run from the backend folder:
+    python -m benchmarks.validate_cart --sizes 1 10 50 200 --repeat 200
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel
+
+from app.db import build_engine
+from app.models.product import Product
+from app.routes.checkout import Cart, validate_cart
+
+
+def per_line_validate(cart: Cart, session: Session) -> list[dict]:
+    # The previous implementation: one primary-key lookup per cart line
+    errors = []
+    for item in cart.items:
+        product = session.get(Product, item.product_id)
+        if not product:
+            errors.append({"product_id": item.product_id, "reason": "NOT_FOUND"})
+        elif item.quantity > product.stock:
+            errors.append({"product_id": item.product_id, "reason": "OUT_OF_STOCK"})
+    return errors
+
+
+def timed(fn, cart: Cart, engine, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        # Fresh session each time, like one request
+        with Session(engine) as session:
+            started = time.perf_counter()
+            fn(cart, session)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(
+                Product(title=f"Product {i}", price_cents=100, currency="EUR", stock=1_000, slug=f"p-{i}")
+                for i in range(args.products)
+            )
+            session.commit()
+
+        rng = random.Random(7)
+        print(f"{'lines':>6} {'per-line p50':>13} {'per-line p95':>13} {'batched p50':>12} {'batched p95':>12}  (ms)")
+        for size in args.sizes:
+            cart = Cart(items=[
+                {"product_id": rng.randint(1, args.products), "quantity": 1} for _ in range(size)
+            ])
+            old = timed(per_line_validate, cart, engine, args.repeat)
+            new = timed(validate_cart, cart, engine, args.repeat)
+            p95 = lambda xs: statistics.quantiles(xs, n=20)[-1]
+            print(
+                f"{size:>6} {statistics.median(old):>13.3f} {p95(old):>13.3f}"
+                f" {statistics.median(new):>12.3f} {p95(new):>12.3f}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, select
+
+from app.db import build_engine
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.ordering import place_order
+
+# Many clients ordering one product with little stock at the same time:
+# stock must never go negative and every unit sold must come out of it.
+STOCK = 120
+ORDERS = 400
+WORKERS = 32
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'stock.db'}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def product_id(engine):
+    with Session(engine) as session:
+        product = Product(title="Hot item", price_cents=1000, currency="EUR", stock=STOCK, slug="hot-item")
+        session.add(product)
+        session.commit()
+        return product.id
+
+
+def place_concurrently(engine, product_id: int, quantities: list[int]) -> list[int]:
+    # Status of each order: 201 placed, 409 out of stock
+    def place(i: int) -> int:
+        with Session(engine) as session:
+            items = [{"product_id": product_id, "quantity": quantities[i]}]
+            try:
+                place_order(session, f"user{i}@example.com", items)
+                session.commit()
+            except HTTPException as exc:
+                return exc.status_code
+            return 201
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        return list(pool.map(place, range(len(quantities))))
+
+
+def sales(engine, product_id: int) -> tuple[int, int, int]:
+    # (stock left, units sold, orders stored)
+    with Session(engine) as session:
+        stock = session.get(Product, product_id).stock
+        sold = session.exec(select(func.coalesce(func.sum(OrderItem.quantity), 0))).one()
+        orders = session.exec(select(func.count()).select_from(Order)).one()
+    return stock, sold, orders
+
+
+def test_single_units_sell_exactly_the_stock(engine, product_id):
+    statuses = place_concurrently(engine, product_id, [1] * ORDERS)
+
+    stock, sold, orders = sales(engine, product_id)
+    assert stock == 0
+    assert sold == STOCK
+    assert statuses.count(201) == orders == STOCK
+    assert statuses.count(409) == ORDERS - STOCK
+
+
+def test_mixed_quantities_never_oversell(engine, product_id):
+    rng = random.Random(42)
+    quantities = [rng.randint(1, 3) for _ in range(ORDERS)]
+    statuses = place_concurrently(engine, product_id, quantities)
+
+    stock, sold, orders = sales(engine, product_id)
+    assert stock >= 0
+    assert sold + stock == STOCK
+    assert sold == sum(q for q, status in zip(quantities, statuses) if status == 201)
+    assert statuses.count(201) == orders
+    assert set(statuses) <= {201, 409}
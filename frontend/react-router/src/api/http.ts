@@ -38,3 +38,34 @@ export async function api<T>(path: string, init: RequestInit = {}): Promise<T> {
   if (res.status === 204) return undefined as T;
   return (await res.json()) as T;
 }
+
+export type Page<T> = {
+  items: T[];
+  nextCursor: string | null;
+};
+
+// Fetch one page of a cursor-paginated list (next cursor comes in X-Next-Cursor)
+export async function apiPage<T>(
+  path: string,
+  cursor?: string | null,
+  init: RequestInit = {}
+): Promise<Page<T>> {
+  const url = cursor
+    ? `${path}${path.includes("?") ? "&" : "?"}cursor=${encodeURIComponent(cursor)}`
+    : path;
+
+  const token = getToken();
+  const headers = new Headers(init.headers || {});
+  if (token && !headers.has("Authorization")) headers.set("Authorization", `Bearer ${token}`);
+
+  const res = await fetch(`${API_BASE}${url}`, { headers });
+  if (!res.ok) {
+    const text = await res.text().catch(() => "");
+    throw new Error(text || `HTTP ${res.status}`);
+  }
+
+  return {
+    items: (await res.json()) as T[],
+    nextCursor: res.headers.get("X-Next-Cursor"),
+  };
+}
@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
-import { api } from "../api/http";
+import { api, apiPage } from "../api/http";
+import type { Page } from "../api/http";
 import type { Product } from "../context/CartContext";
 
 // Admin page to manage products
@@ -8,12 +9,18 @@ export default function AdminProducts() {
   const [products, setProducts] = useState<Product[]>([]);
   const [err, setErr] = useState<string | null>(null);
 
-  // Load all products from the API
+  // Load all products from the API, following the pagination cursors
   async function load() {
     setErr(null);
     try {
-      const data = await api<Product[]>("/products/");
-      setProducts(data);
+      const all: Product[] = [];
+      let cursor: string | null = null;
+      do {
+        const page: Page<Product> = await apiPage<Product>("/products/?limit=200", cursor);
+        all.push(...page.items);
+        cursor = page.nextCursor;
+      } while (cursor);
+      setProducts(all);
     } catch (e: any) {
       setErr(e?.message ?? String(e));
     }
@@ -18,6 +18,10 @@ export default function Cart() {
     return items.reduce((sum, it) => sum + it.product.price_cents * it.quantity, 0);
   }, [items]);
 
+  // One idempotency key per cart contents: retries of the same checkout
+  // (double click, network error) never create a second order
+  const checkoutKey = useMemo(() => crypto.randomUUID(), [items]);
+
   async function validateAndCheckout() {
     setMsg(null);
     setErr(null);
@@ -37,17 +41,10 @@ export default function Cart() {
     };
 
     try {
-      // 1) Validate cart
-      await api<{ ok: true }>("/checkout/validate", {
-        method: "POST",
-        headers: { "X-User-Email": user.email },
-        body: JSON.stringify(payload),
-      });
-
-      // 2) Create order
-      const order = await api<{ id: number }>("/orders/", {
+      // Validate the cart and create the order in a single request
+      const order = await api<{ id: number }>("/checkout/", {
         method: "POST",
-        headers: { "X-User-Email": user.email },
+        headers: { "X-User-Email": user.email, "Idempotency-Key": checkoutKey },
         body: JSON.stringify(payload),
       });
 
@@ -1,6 +1,6 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
-import { api } from "../api/http";
+import { api, apiPage } from "../api/http";
 import type { Product } from "../context/CartContext";
 import { useCart } from "../context/CartContext";
 import { useAuth } from "../context/AuthContext";
@@ -12,29 +12,65 @@ export default function Home() {
   const [products, setProducts] = useState<Product[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [q, setQ] = useState("");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [results, setResults] = useState<Product[] | null>(null);
 
   const { addToCart } = useCart();
   const { token, logout } = useAuth();
   const navigate = useNavigate();
 
   useEffect(() => {
-    // Load products on first render
-    api<Product[]>("/products/")
-      .then(setProducts)
+    // Load the first page of products on first render
+    apiPage<Product>("/products/")
+      .then((page) => {
+        setProducts(page.items);
+        setNextCursor(page.nextCursor);
+      })
       .catch((e) => setError(String(e.message ?? e)));
   }, []);
 
-  // Filter products by title/description
-  const filtered = useMemo(() => {
-    const query = q.trim().toLowerCase();
-    if (!query) return products;
+  async function loadMore() {
+    // Append the next page using the cursor returned by the backend
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await apiPage<Product>("/products/", nextCursor);
+      setProducts((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (e: any) {
+      setError(String(e?.message ?? e));
+    } finally {
+      setLoadingMore(false);
+    }
+  }
 
-    return products.filter((p) => {
-      const title = (p.title ?? "").toLowerCase();
-      const desc = (p.description ?? "").toLowerCase();
-      return title.includes(query) || desc.includes(query);
-    });
-  }, [products, q]);
+  // Search on the backend (debounced); an empty query shows the paginated catalog
+  useEffect(() => {
+    const query = q.trim();
+    if (!query) {
+      setResults(null);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      api<Product[]>(`/products/search?q=${encodeURIComponent(query)}`)
+        .then((data) => {
+          if (!cancelled) setResults(data);
+        })
+        .catch((e) => {
+          if (!cancelled) setError(String(e.message ?? e));
+        });
+    }, 200);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [q]);
+
+  const filtered = results ?? products;
 
   async function deleteAccount() {
     // Confirm destructive action
@@ -170,6 +206,23 @@ export default function Home() {
           ))}
         </div>
       )}
+
+      {nextCursor && results === null && (
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          style={{
+            justifySelf: "center",
+            padding: "8px 14px",
+            borderRadius: 10,
+            border: "1px solid #e5e7eb",
+            background: "#ffffff",
+            cursor: loadingMore ? "wait" : "pointer",
+          }}
+        >
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
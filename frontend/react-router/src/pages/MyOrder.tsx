@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import { useAuth } from "../context/AuthContext";
-import { api } from "../api/http";
+import { apiPage } from "../api/http";
 import "./MyOrder.css";
 
 type OrderItem = {
@@ -32,6 +32,8 @@ export default function MyOrder() {
   const { user, isAuthenticated } = useAuth();
   const [orders, setOrders] = useState<Order[] | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     let cancelled = false;
@@ -49,13 +51,15 @@ export default function MyOrder() {
         // Important: if your backend uses X-User-Email,
         // and your api() adds it from localStorage("orders:user_email"),
         // make sure you store that email during login.
-        const data = await api<Order[]>("/orders/my", {
-          method: "GET",
+        const page = await apiPage<Order>("/orders/my", null, {
           // If you want to enforce it here too (in case it's not in localStorage):
           headers: { "X-User-Email": user.email },
         });
 
-        if (!cancelled) setOrders(data);
+        if (!cancelled) {
+          setOrders(page.items);
+          setNextCursor(page.nextCursor);
+        }
       } catch (e: any) {
         if (!cancelled) setError(String(e?.message ?? e));
       }
@@ -67,6 +71,23 @@ export default function MyOrder() {
     };
   }, [isAuthenticated, user?.email]);
 
+  async function loadMore() {
+    // Append the next page of older orders
+    if (!nextCursor || !user?.email) return;
+    setLoadingMore(true);
+    try {
+      const page = await apiPage<Order>("/orders/my", nextCursor, {
+        headers: { "X-User-Email": user.email },
+      });
+      setOrders((prev) => [...(prev ?? []), ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (e: any) {
+      setError(String(e?.message ?? e));
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   if (error) {
     return (
       <div className="orders">
@@ -113,6 +134,12 @@ export default function MyOrder() {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <button className="orders-more" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Loading…" : "Load older orders"}
+        </button>
+      )}
     </div>
   );
 }